@@ -0,0 +1,40 @@
+"""drop listing price history brin
+
+Revision ID: 1d6e8b3f0a57
+Revises: f3a1c7d9e264
+Create Date: 2026-10-17 18:03:27.541806
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1d6e8b3f0a57"
+down_revision: Union[str, None] = "f3a1c7d9e264"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every price history read filters on card_id and is served by the
+    # (card_id, observed_at) btree; the BRIN index only cost writes.
+    op.drop_index(
+        "ix_listing_price_history_observed_at_brin",
+        table_name="listing_price_history",
+        postgresql_using="brin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_listing_price_history_observed_at_brin",
+        "listing_price_history",
+        ["observed_at"],
+        postgresql_using="brin",
+    )
@@ -0,0 +1,29 @@
+"""add card content hash
+
+Revision ID: 5b7d2e9c41a3
+Revises: e14a9b08a668
+Create Date: 2026-10-17 09:12:40.318245
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7d2e9c41a3"
+down_revision: Union[str, None] = "e14a9b08a668"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("cards", sa.Column("content_hash", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("cards", "content_hash")
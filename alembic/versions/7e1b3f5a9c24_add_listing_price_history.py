@@ -0,0 +1,109 @@
+"""add listing price history
+
+Revision ID: 7e1b3f5a9c24
+Revises: d2a9f0c36b58
+Create Date: 2026-10-17 13:08:37.415209
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e1b3f5a9c24"
+down_revision: Union[str, None] = "d2a9f0c36b58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "listing_price_history",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("listing_id", sa.Integer(), nullable=False),
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("card_id", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("observed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_listing_price_history_observed_at_brin",
+        "listing_price_history",
+        ["observed_at"],
+        postgresql_using="brin",
+    )
+    op.create_index(
+        "ix_listing_price_history_card_id_observed_at",
+        "listing_price_history",
+        ["card_id", "observed_at"],
+    )
+
+    # One function behind two triggers: every new listing gets a first point,
+    # and updates only add one when price or quantity actually changed (an
+    # upsert that just bumps last_seen adds nothing).
+    op.execute(
+        """
+        CREATE FUNCTION record_listing_price() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO listing_price_history
+                (listing_id, seller_id, card_id, price, quantity, observed_at)
+            VALUES (
+                NEW.id, NEW.seller_id, NEW.card_id, NEW.price, NEW.quantity,
+                COALESCE(NEW.last_seen, now() AT TIME ZONE 'utc')
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER listings_price_history_insert
+        AFTER INSERT ON listings
+        FOR EACH ROW EXECUTE FUNCTION record_listing_price();
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER listings_price_history_update
+        AFTER UPDATE OF price, quantity ON listings
+        FOR EACH ROW
+        WHEN (OLD.price IS DISTINCT FROM NEW.price
+              OR OLD.quantity IS DISTINCT FROM NEW.quantity)
+        EXECUTE FUNCTION record_listing_price();
+        """
+    )
+
+    # Seed the series with the current state of every listing.
+    op.execute(
+        """
+        INSERT INTO listing_price_history
+            (listing_id, seller_id, card_id, price, quantity, observed_at)
+        SELECT id, seller_id, card_id, price, quantity,
+               COALESCE(last_seen, now() AT TIME ZONE 'utc')
+        FROM listings
+        ORDER BY last_seen;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS listings_price_history_update ON listings")
+    op.execute("DROP TRIGGER IF EXISTS listings_price_history_insert ON listings")
+    op.execute("DROP FUNCTION IF EXISTS record_listing_price()")
+    op.drop_index(
+        "ix_listing_price_history_card_id_observed_at",
+        table_name="listing_price_history",
+    )
+    op.drop_index(
+        "ix_listing_price_history_observed_at_brin",
+        table_name="listing_price_history",
+    )
+    op.drop_table("listing_price_history")
@@ -0,0 +1,95 @@
+"""add listing search indexes
+
+Revision ID: 9f3c6a1d8e27
+Revises: 5b7d2e9c41a3
+Create Date: 2026-10-17 10:04:18.552091
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9f3c6a1d8e27"
+down_revision: Union[str, None] = "5b7d2e9c41a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Built CONCURRENTLY so the scraper can keep writing while they build,
+    # which can't happen inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_cards_name", "cards", ["name"], postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_cards_name_trgm",
+            "cards",
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_listings_card_id_price",
+            "listings",
+            ["card_id", "price"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_listings_seller_id_last_seen",
+            "listings",
+            ["seller_id", "last_seen"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_listings_in_stock_card_id_price",
+            "listings",
+            ["card_id", "price"],
+            postgresql_where=sa.text("quantity > 0"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_listings_in_stock_seller_id_card_id",
+            "listings",
+            ["seller_id", "card_id"],
+            postgresql_where=sa.text("quantity > 0"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_listings_in_stock_seller_id_card_id",
+            table_name="listings",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_listings_in_stock_card_id_price",
+            table_name="listings",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_listings_seller_id_last_seen",
+            table_name="listings",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_listings_card_id_price",
+            table_name="listings",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_cards_name_trgm", table_name="cards", postgresql_concurrently=True
+        )
+        op.drop_index("ix_cards_name", table_name="cards", postgresql_concurrently=True)
+    # pg_trgm is left installed; other objects may depend on it.
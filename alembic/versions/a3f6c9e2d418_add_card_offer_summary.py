@@ -0,0 +1,62 @@
+"""add card offer summary
+
+Revision ID: a3f6c9e2d418
+Revises: 7e1b3f5a9c24
+Create Date: 2026-10-17 13:52:14.860342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f6c9e2d418"
+down_revision: Union[str, None] = "7e1b3f5a9c24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "card_offer_summary",
+        sa.Column("card_id", sa.Integer(), nullable=False),
+        sa.Column("condition", sa.Text(), nullable=False),
+        sa.Column("foil", sa.Boolean(), nullable=False),
+        sa.Column("language", sa.Text(), nullable=False),
+        sa.Column("min_price", sa.Float(), nullable=False),
+        sa.Column("min_seller_id", sa.Integer(), nullable=False),
+        sa.Column("min_listing_id", sa.Integer(), nullable=False),
+        sa.Column("total_quantity", sa.Integer(), nullable=False),
+        sa.Column("offer_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("card_id", "condition", "foil", "language"),
+    )
+
+    # Build the summary once from the current listings; from here on it is
+    # refreshed per card as listings are written.
+    op.execute(
+        """
+        INSERT INTO card_offer_summary (card_id, condition, foil, language,
+            min_price, min_seller_id, min_listing_id, total_quantity,
+            offer_count, updated_at)
+        SELECT card_id, condition, COALESCE(foil, false), language,
+               min(price),
+               (array_agg(seller_id ORDER BY price, id))[1],
+               (array_agg(id ORDER BY price, id))[1],
+               sum(quantity),
+               count(*),
+               now() AT TIME ZONE 'utc'
+        FROM listings
+        WHERE quantity > 0 AND removed_at IS NULL
+        GROUP BY card_id, condition, COALESCE(foil, false), language;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("card_offer_summary")
@@ -0,0 +1,39 @@
+"""add data version
+
+Revision ID: b81d4e7f2c63
+Revises: a3f6c9e2d418
+Create Date: 2026-10-17 14:37:45.129584
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b81d4e7f2c63"
+down_revision: Union[str, None] = "a3f6c9e2d418"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "data_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(
+        "INSERT INTO data_version (id, version, updated_at) "
+        "VALUES (1, 0, now() AT TIME ZONE 'utc')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("data_version")
@@ -0,0 +1,41 @@
+"""add crawl state
+
+Revision ID: c4e8a7b2f915
+Revises: 9f3c6a1d8e27
+Create Date: 2026-10-17 11:41:02.774310
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e8a7b2f915"
+down_revision: Union[str, None] = "9f3c6a1d8e27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "crawl_state",
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("last_completed_page", sa.Integer(), nullable=False),
+        sa.Column("page_count", sa.Integer(), nullable=True),
+        sa.Column("listing_count", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["seller_id"], ["sellers.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("seller_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("crawl_state")
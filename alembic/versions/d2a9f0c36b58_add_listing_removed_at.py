@@ -0,0 +1,31 @@
+"""add listing removed_at and crawl fingerprint
+
+Revision ID: d2a9f0c36b58
+Revises: c4e8a7b2f915
+Create Date: 2026-10-17 12:26:51.093117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a9f0c36b58"
+down_revision: Union[str, None] = "c4e8a7b2f915"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("listings", sa.Column("removed_at", sa.DateTime(), nullable=True))
+    op.add_column("crawl_state", sa.Column("fingerprint", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("crawl_state", "fingerprint")
+    op.drop_column("listings", "removed_at")
@@ -0,0 +1,45 @@
+"""add crawl jobs
+
+Revision ID: e5c2a8f17b90
+Revises: b81d4e7f2c63
+Create Date: 2026-10-17 15:46:09.532871
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5c2a8f17b90"
+down_revision: Union[str, None] = "b81d4e7f2c63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "crawl_jobs",
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("lease_owner", sa.Text(), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["seller_id"], ["sellers.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("seller_id"),
+    )
+    op.create_index(
+        "ix_crawl_jobs_status_priority", "crawl_jobs", ["status", "priority"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_crawl_jobs_status_priority", table_name="crawl_jobs")
+    op.drop_table("crawl_jobs")
@@ -0,0 +1,36 @@
+"""add crawl state listings written
+
+Revision ID: f3a1c7d9e264
+Revises: e5c2a8f17b90
+Create Date: 2026-10-17 17:12:40.218364
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a1c7d9e264"
+down_revision: Union[str, None] = "e5c2a8f17b90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "crawl_state",
+        sa.Column("listings_written", sa.Integer(), server_default="0", nullable=False),
+    )
+    # Unfinished crawls kept their progress in listing_count until now.
+    op.execute(
+        "UPDATE crawl_state SET listings_written = listing_count WHERE status <> 'complete'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("crawl_state", "listings_written")
@@ -0,0 +1,309 @@
+import base64
+import functools
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask, Response, abort, jsonify, request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+
+from app.data_version import DATA_VERSION_SQL
+from app.db import get_sync_engine
+from app.offers import OFFER_FILTERS, cheapest_offers_query
+from app.price_history import series_query
+from app.response_cache import ResponseCache
+from config import (
+    API_PAGE_SIZE,
+    API_MAX_PAGE_SIZE,
+    API_CACHE_TTL,
+    API_VERSION_CHECK_INTERVAL,
+)
+
+# Read-only HTTP API over cards, listings, sellers and price history.
+# Run with `flask --app app.api run` (or `python -m app.api`).
+
+CARD_SEARCH_SQL = """
+SELECT id, name, set_name, image_url, mana_cost, mana_value, types
+FROM cards
+WHERE name ILIKE :pattern {keyset}
+ORDER BY name, id
+LIMIT :limit;
+"""
+
+CARD_OFFERS_SQL = """
+SELECT l.id, l.bdv_listing_id, l.seller_id, s.name AS seller_name, l.price,
+       l.quantity, l.condition, l.foil, l.language, l.last_seen
+FROM listings l
+JOIN sellers s ON s.id = l.seller_id
+WHERE l.card_id = :card_id AND l.quantity > 0 AND l.removed_at IS NULL {filters} {keyset}
+ORDER BY l.price, l.id
+LIMIT :limit;
+"""
+
+SELLER_INVENTORY_SQL = """
+SELECT l.id, l.bdv_listing_id, l.card_id, c.name AS card_name, c.set_name,
+       l.price, l.quantity, l.condition, l.foil, l.language, l.last_seen
+FROM listings l
+JOIN cards c ON c.id = l.card_id
+WHERE l.seller_id = :seller_id AND l.quantity > 0 AND l.removed_at IS NULL {keyset}
+ORDER BY l.id
+LIMIT :limit;
+"""
+
+app = Flask(__name__)
+cache = ResponseCache()
+
+_version_lock = threading.Lock()
+_version_checked_at = 0.0
+
+
+def refresh_data_version():
+    """
+    Poll the data_version marker at most every API_VERSION_CHECK_INTERVAL
+    seconds and invalidate the response cache when a scrape has committed.
+    """
+    global _version_checked_at
+    now = time.monotonic()
+    if now - _version_checked_at < API_VERSION_CHECK_INTERVAL:
+        return
+    with _version_lock:
+        if now - _version_checked_at < API_VERSION_CHECK_INTERVAL:
+            return
+        _version_checked_at = now
+        try:
+            with get_sync_engine().connect() as conn:
+                version = conn.execute(text(DATA_VERSION_SQL)).scalar()
+        except SQLAlchemyError as e:
+            print(f"Could not read data_version: {e}")
+            return
+        cache.set_version(version)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+# Cursor key types: a JSON number (prices) or an integer id. bool is an int
+# subclass in Python, so it is rejected explicitly.
+NUMBER = (int, float)
+
+
+def decode_cursor(cursor, types):
+    """
+    Return the key values encoded in a pagination cursor, checking that
+    there is one per entry of `types` and that each is of that type.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or any(
+            isinstance(value, bool) or not isinstance(value, expected)
+            for value, expected in zip(values, types)
+        )
+    ):
+        abort(400, description="Invalid cursor.")
+    return values
+
+
+def page_limit():
+    limit = request.args.get("limit", API_PAGE_SIZE, type=int)
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def keyset_page(sql, params, limit, cursor_keys):
+    """
+    Run a keyset-paginated query and return {"items", "next"}.
+
+    One extra row is fetched to know whether there is a next page; `next`
+    is the cursor built from `cursor_keys` of the last returned row.
+    """
+    with get_sync_engine().connect() as conn:
+        rows = [
+            dict(row)
+            for row in conn.execute(
+                text(sql), {**params, "limit": limit + 1}
+            ).mappings()
+        ]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][key] for key in cursor_keys])
+    return {"items": rows, "next": next_cursor}
+
+
+def parse_bool(value):
+    if value is None:
+        return None
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    abort(400, description=f"Invalid boolean {value!r}.")
+
+
+def parse_datetime(value):
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"Invalid datetime {value!r}.")
+
+
+def cached_json(view):
+    """
+    Serve a view's JSON payload from the response cache, with an ETag so
+    pollers holding a current copy get a 304 without a body.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        refresh_data_version()
+        key = request.full_path
+        cached = cache.get(key)
+        if cached is None:
+            # The version the response is rendered under; if the data changes
+            # meanwhile, put() refuses the now-stale response.
+            version = cache.version
+            payload = view(*args, **kwargs)
+            body = json.dumps(payload, default=str, separators=(",", ":")).encode(
+                "utf-8"
+            )
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            cached = (etag, body)
+            cache.put(key, cached, version)
+        etag, body = cached
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={int(API_CACHE_TTL)}"
+        return response
+
+    return wrapper
+
+
+@app.errorhandler(HTTPException)
+def json_error(error):
+    response = jsonify({"error": error.name, "description": error.description})
+    response.status_code = error.code
+    return response
+
+
+@app.get("/cards")
+@cached_json
+def search_cards():
+    """Cards whose name contains `q` (case-insensitive), by name."""
+    query = request.args.get("q", "")
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    params = {"pattern": f"%{escaped}%"}
+    keyset = ""
+    if "after" in request.args:
+        after_name, after_id = decode_cursor(request.args["after"], (str, int))
+        keyset = "AND (name, id) > (:after_name, :after_id)"
+        params.update(after_name=after_name, after_id=after_id)
+    sql = CARD_SEARCH_SQL.format(keyset=keyset)
+    return keyset_page(sql, params, page_limit(), ("name", "id"))
+
+
+@app.get("/cards/<int:card_id>/offers")
+@cached_json
+def card_offers(card_id):
+    """Live in-stock listings of a card, cheapest first."""
+    params = {"card_id": card_id}
+    filters = ""
+    for field in OFFER_FILTERS:
+        value = request.args.get(field)
+        if value is None:
+            continue
+        params[field] = parse_bool(value) if field == "foil" else value
+        filters += f" AND l.{field} = :{field}"
+    keyset = ""
+    if "after" in request.args:
+        after_price, after_id = decode_cursor(request.args["after"], (NUMBER, int))
+        keyset = "AND (l.price, l.id) > (:after_price, :after_id)"
+        params.update(after_price=after_price, after_id=after_id)
+    sql = CARD_OFFERS_SQL.format(filters=filters, keyset=keyset)
+    return keyset_page(sql, params, page_limit(), ("price", "id"))
+
+
+@app.get("/cards/<int:card_id>/cheapest")
+@cached_json
+def card_cheapest(card_id):
+    """Cheapest offer per (condition, foil, language), from the summary table."""
+    filters = {
+        field: request.args.get(field)
+        for field in OFFER_FILTERS
+        if request.args.get(field) is not None
+    }
+    if "foil" in filters:
+        filters["foil"] = parse_bool(filters["foil"])
+    sql, params = cheapest_offers_query(
+        card_ids=[card_id], limit=page_limit(), **filters
+    )
+    with get_sync_engine().connect() as conn:
+        rows = [dict(row) for row in conn.execute(text(sql), params).mappings()]
+    return {"items": rows}
+
+
+@app.get("/cards/<int:card_id>/price-history")
+@cached_json
+def card_price_history(card_id):
+    """
+    Price points of a card across sellers, oldest first, or min/avg/max per
+    `bucket`. Unbucketed points are keyset-paginated.
+    """
+    bucket = request.args.get("bucket")
+    since = parse_datetime(request.args.get("since"))
+    until = parse_datetime(request.args.get("until"))
+    after = None
+    if "after" in request.args and bucket is None:
+        after_observed_at, after_id = decode_cursor(request.args["after"], (str, int))
+        try:
+            after = (datetime.fromisoformat(after_observed_at), after_id)
+        except ValueError:
+            abort(400, description="Invalid cursor.")
+    try:
+        sql, params = series_query(card_id, since, until, bucket, after)
+    except ValueError as e:
+        abort(400, description=str(e))
+    if bucket is None:
+        return keyset_page(sql, params, page_limit(), ("observed_at", "id"))
+    with get_sync_engine().connect() as conn:
+        rows = [dict(row) for row in conn.execute(text(sql), params).mappings()]
+    return {"items": rows}
+
+
+@app.get("/sellers/<int:seller_id>/listings")
+@cached_json
+def seller_inventory(seller_id):
+    """A seller's live in-stock listings, by listing id."""
+    params = {"seller_id": seller_id}
+    keyset = ""
+    if "after" in request.args:
+        (after_id,) = decode_cursor(request.args["after"], (int,))
+        keyset = "AND l.id > :after_id"
+        params["after_id"] = after_id
+    sql = SELLER_INVENTORY_SQL.format(keyset=keyset)
+    return keyset_page(sql, params, page_limit(), ("id",))
+
+
+@app.get("/stats")
+def stats():
+    """Response cache counters (never cached)."""
+    return jsonify(cache.stats())
+
+
+if __name__ == "__main__":
+    app.run(threaded=True)
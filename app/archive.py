@@ -0,0 +1,237 @@
+import glob
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import zlib
+from datetime import datetime
+
+from config import (
+    ARCHIVE_MODE,
+    ARCHIVE_DIR,
+    ARCHIVE_COMPRESSION,
+    ARCHIVE_SEGMENT_BYTES,
+    ARCHIVE_SAMPLE_RATE,
+    ARCHIVE_QUEUE_SIZE,
+)
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; gzip is always available.
+    zstandard = None
+
+ARCHIVE_MODES = ("off", "segments", "sample")
+SEGMENT_SUFFIXES = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz", "none": ".jsonl"}
+
+_archive = None
+
+
+def _open_segment(path, compression):
+    """Open a segment file for binary writing with the given compression."""
+    if compression == "zstd":
+        raw = open(path, "wb")
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    return open(path, "wb")
+
+
+def _read_segment(path):
+    """Open a segment file for reading text lines, by its suffix."""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is needed to read {path}")
+        raw = open(path, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class ArchiveSink:
+    """
+    Append-only archive of raw store page responses for one scrape run.
+
+    Records ({seller, page, fetched_at, html, pagination_html}) are written
+    as JSON lines to compressed segment files under `<dir>/<time>-<pid>/`,
+    rotated every `segment_bytes` of uncompressed data. Compression and
+    disk I/O happen on a background thread; `write` only enqueues, and
+    drops (and counts) records if the writer falls `queue_size` behind.
+
+    In "sample" mode only a deterministic fraction of pages (by seller and
+    page number) is kept; "off" keeps nothing.
+    """
+
+    def __init__(
+        self,
+        mode=ARCHIVE_MODE,
+        directory=ARCHIVE_DIR,
+        compression=ARCHIVE_COMPRESSION,
+        segment_bytes=ARCHIVE_SEGMENT_BYTES,
+        sample_rate=ARCHIVE_SAMPLE_RATE,
+        queue_size=ARCHIVE_QUEUE_SIZE,
+    ):
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(
+                f"Unknown archive mode {mode!r}; choose from {ARCHIVE_MODES}"
+            )
+        if compression == "zstd" and zstandard is None:
+            print("zstandard is not installed; archiving with gzip.")
+            compression = "gzip"
+        if compression not in SEGMENT_SUFFIXES:
+            raise ValueError(f"Unknown archive compression {compression!r}")
+        self.mode = mode
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.sample_rate = sample_rate
+        # The pid keeps processes started in the same second (e.g. several
+        # crawl workers on one host) out of each other's segments.
+        self.run_dir = os.path.join(
+            directory, f"{datetime.utcnow():%Y%m%dT%H%M%SZ}-{os.getpid()}"
+        )
+        self.written = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.segments = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
+        if mode != "off":
+            os.makedirs(self.run_dir, exist_ok=True)
+            self._thread = threading.Thread(
+                target=self._run, name="archive-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _sampled(self, seller_name, page):
+        if self.mode == "segments":
+            return True
+        if self.mode == "sample":
+            key = f"{seller_name}|{page}".encode("utf-8")
+            return zlib.crc32(key) / 2**32 < self.sample_rate
+        return False
+
+    def write(self, seller_name, page, response):
+        """Queue a raw page response ({html, pagination_html}) for archiving."""
+        if not self._sampled(seller_name, page):
+            self.skipped += 1
+            return
+        record = {
+            "seller": seller_name,
+            "page": page,
+            "fetched_at": datetime.utcnow().isoformat(),
+            "html": response.get("html", ""),
+            "pagination_html": response.get("pagination_html", ""),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _segment_path(self):
+        name = f"segment-{self.segments:05d}{SEGMENT_SUFFIXES[self.compression]}"
+        self.segments += 1
+        return os.path.join(self.run_dir, name)
+
+    def _run(self):
+        segment = None
+        segment_size = 0
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+                if segment is None or segment_size >= self.segment_bytes:
+                    if segment is not None:
+                        segment.close()
+                    segment = _open_segment(self._segment_path(), self.compression)
+                    segment_size = 0
+                segment.write(line)
+                segment_size += len(line)
+                self.written += 1
+        except Exception as e:
+            # Kept for close() to re-raise; the thread itself just stops.
+            self._error = e
+        finally:
+            if segment is not None:
+                segment.close()
+
+    def close(self):
+        """
+        Flush queued records and close the current segment. Re-raises the
+        writer thread's error if it died.
+        """
+        if self._thread is not None:
+            # A dead writer never drains a full queue; don't block on it.
+            while self._thread.is_alive():
+                try:
+                    self._queue.put(None, timeout=1.0)
+                    break
+                except queue.Full:
+                    continue
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Archive writer failed: {error}") from error
+
+    def report(self):
+        if self.mode == "off":
+            return
+        print(
+            f"Archive ({self.mode}, {self.compression}): {self.written} pages in "
+            f"{self.segments} segments under {self.run_dir}, {self.skipped} not "
+            f"sampled, {self.dropped} dropped (writer behind)."
+        )
+
+
+def get_archive():
+    """Return the shared archive sink, creating it on first use."""
+    global _archive
+    if _archive is None:
+        _archive = ArchiveSink()
+    return _archive
+
+
+def open_archive(**kwargs):
+    """Replace the shared archive sink with one built from `kwargs`."""
+    global _archive
+    close_archive()
+    _archive = ArchiveSink(**kwargs)
+    return _archive
+
+
+def close_archive():
+    """Flush and close the shared archive sink, if one was created."""
+    global _archive
+    if _archive is not None:
+        archive, _archive = _archive, None
+        try:
+            archive.close()
+        finally:
+            archive.report()
+
+
+def archive_segments(path):
+    """Segment files under `path` (a run dir, the archive root, or one file)."""
+    if os.path.isfile(path):
+        return [path]
+    segments = []
+    for suffix in SEGMENT_SUFFIXES.values():
+        segments.extend(
+            glob.glob(os.path.join(path, "**", f"*{suffix}"), recursive=True)
+        )
+    return sorted(segments)
+
+
+def iter_archive(path):
+    """Yield archived page records from every segment under `path`, in order."""
+    for segment_path in archive_segments(path):
+        with _read_segment(segment_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
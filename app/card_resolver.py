@@ -0,0 +1,142 @@
+import asyncio
+from collections import OrderedDict
+from sqlalchemy import text
+
+from app.name_matching import NameIndex, fuzzy_match_many
+from config import CARD_CACHE_SIZE
+
+
+class CardResolver:
+    """
+    Resolve scraped card names to card ids.
+
+    A single resolver is shared by every seller task of a scrape run, so each
+    distinct name costs at most one database lookup for the whole run. Names
+    are kept in a bounded LRU; names that are not in the cards table are
+    cached as well so repeated misses don't go back to the database.
+
+    Names without an exact match fall back to normalised and fuzzy matching
+    (see app.name_matching).
+    """
+
+    def __init__(self, max_size=CARD_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        # True when every card name fit in the cache during preload, so a
+        # cache miss needs no exact-match query.
+        self._complete = False
+        self.hits = 0
+        self.misses = 0
+        self.not_found = 0
+        self.normalized_matches = 0
+        self.fuzzy_matches = 0
+        # Built on the first name that misses an exact match.
+        self._name_index = None
+        self._index_lock = asyncio.Lock()
+
+    async def preload(self, session):
+        """Load the name -> card_id map in one query, if it fits in the cache."""
+        result = await session.execute(text("SELECT count(DISTINCT name) FROM cards"))
+        distinct_names = result.scalar()
+        if distinct_names > self.max_size:
+            print(
+                f"{distinct_names} card names exceed the resolver cache size "
+                f"({self.max_size}); resolving names per page instead."
+            )
+            return
+
+        result = await session.execute(
+            text("SELECT DISTINCT ON (name) name, id FROM cards ORDER BY name, id")
+        )
+        for name, card_id in result:
+            self._cache[name] = card_id
+        self._complete = True
+        print(f"Preloaded {len(self._cache)} card names.")
+
+    def _remember(self, name, card_id):
+        self._cache[name] = card_id
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+            self._complete = False
+
+    async def resolve_many(self, session, names):
+        """
+        Return a dict mapping each name in `names` to its card id (or None).
+
+        Names missing from the cache are looked up together in a single
+        `WHERE name = ANY(:names)` query.
+        """
+        resolved = {}
+        pending = set()
+        for name in names:
+            if name in resolved or name in pending:
+                continue
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                resolved[name] = self._cache[name]
+                self.hits += 1
+            elif name is None:
+                resolved[name] = None
+                self.hits += 1
+            else:
+                pending.add(name)
+                self.misses += 1
+
+        found = {}
+        if pending and not self._complete:
+            result = await session.execute(
+                text(
+                    "SELECT DISTINCT ON (name) name, id FROM cards "
+                    "WHERE name = ANY(:names) ORDER BY name, id"
+                ),
+                {"names": list(pending)},
+            )
+            found = dict(result.all())
+        unmatched = [name for name in pending if name not in found]
+        if unmatched:
+            found.update(await self._match_inexact(session, unmatched))
+        for name in pending:
+            card_id = found.get(name)
+            self._remember(name, card_id)
+            resolved[name] = card_id
+
+        return resolved
+
+    async def _match_inexact(self, session, names):
+        """
+        Match names that have no exact card name: first through the
+        normalised-name index, then by trigram similarity. Either way the
+        result is cached by the caller, so each odd name is matched once.
+        """
+        async with self._index_lock:
+            if self._name_index is None:
+                self._name_index = await NameIndex.load(session)
+        matched = {}
+        for name in names:
+            card_id = self._name_index.lookup(name)
+            if card_id is not None:
+                matched[name] = card_id
+        self.normalized_matches += len(matched)
+
+        remaining = [name for name in names if name not in matched]
+        fuzzy = await fuzzy_match_many(session, remaining)
+        self.fuzzy_matches += len(fuzzy)
+        matched.update(fuzzy)
+        return matched
+
+    def record_dropped(self, count):
+        """Count listings skipped because their card name was not found."""
+        self.not_found += count
+
+    def report(self):
+        """Print cache hit/miss counts and the number of dropped listings."""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        print(
+            f"Card resolver: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.1f}% hit rate), {len(self._cache)} names cached, "
+            f"{self.normalized_matches} normalised and {self.fuzzy_matches} fuzzy "
+            f"name matches, "
+            f"{self.not_found} listings dropped (card name not found)."
+        )
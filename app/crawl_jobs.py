@@ -0,0 +1,188 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+from app.db import get_session
+from config import CRAWL_JOB_LEASE_SECONDS, CRAWL_JOB_MAX_ATTEMPTS
+
+# (Re)queue a seller. Jobs under a live lease are left to their worker.
+ENQUEUE_JOB_SQL = """
+INSERT INTO crawl_jobs (seller_id, status, priority, attempts, created_at, updated_at)
+VALUES (:seller_id, 'pending', :priority, 0, :now, :now)
+ON CONFLICT (seller_id) DO UPDATE
+SET status = 'pending',
+    priority = EXCLUDED.priority,
+    lease_owner = NULL,
+    lease_expires_at = NULL,
+    attempts = 0,
+    updated_at = EXCLUDED.updated_at
+WHERE crawl_jobs.status <> 'leased' OR crawl_jobs.lease_expires_at < EXCLUDED.updated_at;
+"""
+
+# Lease the most urgent runnable job: pending, or leased by a worker whose
+# lease ran out. SKIP LOCKED lets concurrent workers each take a different
+# row without waiting on one another.
+LEASE_JOB_SQL = """
+UPDATE crawl_jobs j
+SET status = 'leased',
+    lease_owner = :owner,
+    lease_expires_at = :expires_at,
+    attempts = j.attempts + 1,
+    updated_at = :now
+FROM (
+    SELECT seller_id FROM crawl_jobs
+    WHERE (status = 'pending' OR (status = 'leased' AND lease_expires_at < :now))
+      AND attempts < :max_attempts
+    ORDER BY priority, seller_id
+    FOR UPDATE SKIP LOCKED
+    LIMIT 1
+) next_job
+WHERE j.seller_id = next_job.seller_id
+RETURNING j.seller_id, j.attempts;
+"""
+
+# A job whose lease expired on its last attempt can't be leased again; fail
+# it rather than leave it 'leased' forever.
+FAIL_EXHAUSTED_JOBS_SQL = """
+UPDATE crawl_jobs
+SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL, updated_at = :now
+WHERE status = 'leased' AND lease_expires_at < :now AND attempts >= :max_attempts;
+"""
+
+RENEW_LEASE_SQL = """
+UPDATE crawl_jobs
+SET lease_expires_at = :expires_at, updated_at = :now
+WHERE seller_id = :seller_id AND lease_owner = :owner AND status = 'leased';
+"""
+
+FINISH_JOB_SQL = """
+UPDATE crawl_jobs
+SET status = :status, lease_owner = NULL, lease_expires_at = NULL, updated_at = :now
+WHERE seller_id = :seller_id AND lease_owner = :owner;
+"""
+
+# Jobs still in play: runnable ones, and leased ones, which either finish
+# or come back (or fail) once their lease expires.
+OUTSTANDING_JOBS_SQL = """
+SELECT count(*) FROM crawl_jobs
+WHERE (status = 'pending' AND attempts < :max_attempts) OR status = 'leased';
+"""
+
+SELLER_SQL = "SELECT id, name, store_url FROM sellers WHERE id = :seller_id"
+
+
+def default_worker_id():
+    """host:pid:random, unique per worker process."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+async def enqueue_jobs(checkpoints):
+    """Queue a job per planned seller, keeping the plan's order as priority."""
+    now = datetime.utcnow()
+    async with get_session("jobs") as session:
+        if checkpoints:
+            await session.execute(
+                text(ENQUEUE_JOB_SQL),
+                [
+                    {
+                        "seller_id": checkpoint.seller_id,
+                        "priority": priority,
+                        "now": now,
+                    }
+                    for priority, checkpoint in enumerate(checkpoints)
+                ],
+            )
+        await session.commit()
+    print(f"Queued {len(checkpoints)} crawl jobs.")
+
+
+class JobLease:
+    """A worker's claim on one seller's crawl job."""
+
+    def __init__(self, owner, seller, attempts, lease_seconds=CRAWL_JOB_LEASE_SECONDS):
+        self.owner = owner
+        self.seller = seller
+        self.attempts = attempts
+        self.lease_seconds = lease_seconds
+
+    @property
+    def seller_id(self):
+        return self.seller["id"]
+
+    async def renew(self):
+        """Extend the lease; returns False if it was lost to another worker."""
+        now = datetime.utcnow()
+        async with get_session("jobs") as session:
+            result = await session.execute(
+                text(RENEW_LEASE_SQL),
+                {
+                    "seller_id": self.seller_id,
+                    "owner": self.owner,
+                    "expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "now": now,
+                },
+            )
+            await session.commit()
+            return result.rowcount == 1
+
+    async def finish(self, failed=False, max_attempts=CRAWL_JOB_MAX_ATTEMPTS):
+        """Mark the job done, or put a failed one back until it runs out of attempts."""
+        if not failed:
+            status = "done"
+        elif self.attempts < max_attempts:
+            status = "pending"
+        else:
+            status = "failed"
+        async with get_session("jobs") as session:
+            await session.execute(
+                text(FINISH_JOB_SQL),
+                {
+                    "seller_id": self.seller_id,
+                    "owner": self.owner,
+                    "status": status,
+                    "now": datetime.utcnow(),
+                },
+            )
+            await session.commit()
+        return status
+
+
+async def lease_job(
+    owner, lease_seconds=CRAWL_JOB_LEASE_SECONDS, max_attempts=CRAWL_JOB_MAX_ATTEMPTS
+):
+    """Lease the next runnable job for `owner`, or return None if there is none."""
+    now = datetime.utcnow()
+    async with get_session("jobs") as session:
+        failed = await session.execute(
+            text(FAIL_EXHAUSTED_JOBS_SQL), {"now": now, "max_attempts": max_attempts}
+        )
+        if failed.rowcount:
+            print(f"Failed {failed.rowcount} crawl jobs whose last lease expired.")
+        result = await session.execute(
+            text(LEASE_JOB_SQL),
+            {
+                "owner": owner,
+                "now": now,
+                "expires_at": now + timedelta(seconds=lease_seconds),
+                "max_attempts": max_attempts,
+            },
+        )
+        row = result.first()
+        if row is None:
+            await session.commit()
+            return None
+        seller_id, attempts = row
+        result = await session.execute(text(SELLER_SQL), {"seller_id": seller_id})
+        seller = dict(result.mappings().one())
+        await session.commit()
+    return JobLease(owner, seller, attempts, lease_seconds)
+
+
+async def outstanding_jobs(max_attempts=CRAWL_JOB_MAX_ATTEMPTS):
+    async with get_session("jobs") as session:
+        result = await session.execute(
+            text(OUTSTANDING_JOBS_SQL), {"max_attempts": max_attempts}
+        )
+        return result.scalar()
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+from app.db import get_session
+from config import CRAWL_FRESHNESS_HOURS
+
+SAVE_CRAWL_STATE_SQL = """
+INSERT INTO crawl_state (seller_id, status, last_completed_page, page_count, listing_count, listings_written, fingerprint, started_at, finished_at, updated_at)
+VALUES (:seller_id, :status, :last_completed_page, :page_count, :listing_count, :listings_written, :fingerprint, :started_at, :finished_at, :updated_at)
+ON CONFLICT (seller_id) DO UPDATE
+SET status = EXCLUDED.status,
+    last_completed_page = EXCLUDED.last_completed_page,
+    page_count = EXCLUDED.page_count,
+    listing_count = EXCLUDED.listing_count,
+    listings_written = EXCLUDED.listings_written,
+    fingerprint = EXCLUDED.fingerprint,
+    started_at = EXCLUDED.started_at,
+    finished_at = EXCLUDED.finished_at,
+    updated_at = EXCLUDED.updated_at;
+"""
+
+
+class SellerCheckpoint:
+    """
+    Crawl progress for one seller, persisted to the crawl_state table.
+
+    Pages can finish out of order (fan-out, batched writes), so the
+    checkpoint only advances `last_completed_page` over a contiguous run of
+    finished pages; a restart resumes right after it.
+    """
+
+    def __init__(
+        self,
+        seller,
+        resume_page=1,
+        started_at=None,
+        listing_count=0,
+        listings_written=0,
+        page_count=None,
+        finished_at=None,
+        fingerprint=None,
+    ):
+        self.seller = seller
+        self.resume_page = resume_page
+        self.last_completed_page = resume_page - 1
+        self.started_at = started_at or datetime.utcnow()
+        # Store size from the previous crawl, used for prioritising.
+        self.listing_count = listing_count
+        # Listings written or touched by this crawl, including before a resume.
+        self.listings_written = listings_written
+        self.page_count = page_count
+        self.previous_finished_at = finished_at
+        # Page 1 fingerprint of the last complete crawl, and of this one.
+        self.previous_fingerprint = fingerprint
+        self.fingerprint = None
+        # Set when the fingerprint probe found the store unchanged.
+        self.store_unchanged = False
+        # Set once a page reported no 'Next' link: the whole store was seen.
+        self.reached_end = False
+        self.failed = False
+        self._done_pages = set()
+
+    @property
+    def seller_id(self):
+        return self.seller["id"]
+
+    def page_done(self, page):
+        """Record that a page's listings are safely written (or it had none)."""
+        self._done_pages.add(page)
+        while self.last_completed_page + 1 in self._done_pages:
+            self.last_completed_page += 1
+            self._done_pages.discard(self.last_completed_page)
+
+    async def save(self, status="running", finished=False):
+        """
+        Persist progress. The previous crawl's size, finish time and
+        fingerprint (which plan_crawl and the probe rely on) are only
+        replaced once this crawl completes.
+        """
+        now = datetime.utcnow()
+        completed = finished and status == "complete"
+        async with get_session("scrape") as session:
+            await session.execute(
+                text(SAVE_CRAWL_STATE_SQL),
+                {
+                    "seller_id": self.seller_id,
+                    "status": status,
+                    "last_completed_page": self.last_completed_page,
+                    "page_count": self.page_count,
+                    "listing_count": (
+                        self.listings_written if completed else self.listing_count
+                    ),
+                    "listings_written": self.listings_written,
+                    "fingerprint": (
+                        self.fingerprint if completed else self.previous_fingerprint
+                    ),
+                    "started_at": self.started_at,
+                    "finished_at": now if completed else self.previous_finished_at,
+                    "updated_at": now,
+                },
+            )
+            await session.commit()
+
+    async def finish(self):
+        """Mark the crawl complete, or failed if any page could not be done."""
+        await self.save("failed" if self.failed else "complete", finished=True)
+
+
+CRAWL_STATE_SQL = (
+    "SELECT seller_id, status, last_completed_page, page_count, "
+    "listing_count, listings_written, fingerprint, started_at, finished_at "
+    "FROM crawl_state"
+)
+
+
+def checkpoint_from_state(seller, state):
+    """
+    Build the checkpoint for crawling `seller` given its crawl_state row (or
+    None): a fresh crawl after a complete one, or a resume after the last
+    completed page of an interrupted or failed one.
+    """
+    if state is None:
+        return SellerCheckpoint(seller)
+    if state.status == "complete":
+        return SellerCheckpoint(
+            seller,
+            listing_count=state.listing_count or 0,
+            finished_at=state.finished_at,
+            fingerprint=state.fingerprint,
+        )
+    print(
+        f"Resuming {seller['name']} after page {state.last_completed_page} "
+        f"({state.status})."
+    )
+    return SellerCheckpoint(
+        seller,
+        resume_page=state.last_completed_page + 1,
+        started_at=state.started_at,
+        listing_count=state.listing_count or 0,
+        listings_written=state.listings_written or 0,
+        page_count=state.page_count,
+        finished_at=state.finished_at,
+        fingerprint=state.fingerprint,
+    )
+
+
+async def load_checkpoint(session, seller):
+    """Return the checkpoint for crawling one seller now, whatever its freshness."""
+    result = await session.execute(
+        text(CRAWL_STATE_SQL + " WHERE seller_id = :seller_id"),
+        {"seller_id": seller["id"]},
+    )
+    return checkpoint_from_state(seller, result.first())
+
+
+async def plan_crawl(session, sellers, freshness_hours=CRAWL_FRESHNESS_HOURS):
+    """
+    Return a SellerCheckpoint for every seller that needs crawling, in
+    priority order: never-finished and stalest sellers first, then the
+    biggest stores first.
+
+    Sellers whose last crawl completed within `freshness_hours` are
+    skipped; interrupted or failed crawls resume after their last completed
+    page.
+    """
+    result = await session.execute(text(CRAWL_STATE_SQL))
+    states = {row.seller_id: row for row in result}
+    fresh_after = datetime.utcnow() - timedelta(hours=freshness_hours)
+
+    plan = []
+    skipped = 0
+    for seller in sellers:
+        state = states.get(seller["id"])
+        if (
+            state is not None
+            and state.status == "complete"
+            and state.finished_at
+            and state.finished_at >= fresh_after
+        ):
+            skipped += 1
+            continue
+        plan.append(checkpoint_from_state(seller, state))
+
+    plan.sort(
+        key=lambda checkpoint: (
+            checkpoint.previous_finished_at or datetime.min,
+            -checkpoint.listing_count,
+        )
+    )
+    print(
+        f"Crawl plan: {len(plan)} sellers to crawl, {skipped} skipped "
+        f"(completed within {freshness_hours}h)."
+    )
+    return plan
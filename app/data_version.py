@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import text
+
+from app.db import get_session
+
+BUMP_DATA_VERSION_SQL = """
+INSERT INTO data_version (id, version, updated_at)
+VALUES (1, 1, :now)
+ON CONFLICT (id) DO UPDATE
+SET version = data_version.version + 1,
+    updated_at = EXCLUDED.updated_at
+RETURNING version;
+"""
+
+DATA_VERSION_SQL = "SELECT version FROM data_version WHERE id = 1"
+
+
+async def bump_data_version():
+    """Record that new data was committed, invalidating API response caches."""
+    async with get_session("jobs") as session:
+        result = await session.execute(
+            text(BUMP_DATA_VERSION_SQL), {"now": datetime.utcnow()}
+        )
+        await session.commit()
+        return result.scalar()
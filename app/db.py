@@ -1,15 +1,143 @@
 import os
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.metrics import metrics
+
+# The one declarative base; models and Alembic share it.
+from app.models import Base  # noqa: F401
+from config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUTS,
+)
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async pool, recording how long each checkout waited for a
+    connection and how many checkouts timed out.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.inc("db_pool_timeouts_total")
+            raise
+        finally:
+            metrics.observe(
+                "db_pool_checkout_wait_seconds", time.perf_counter() - start
+            )
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=TimedQueuePool,
+    pool_size=_env_int("DB_POOL_SIZE", DB_POOL_SIZE),
+    max_overflow=_env_int("DB_MAX_OVERFLOW", DB_MAX_OVERFLOW),
+    pool_timeout=_env_int("DB_POOL_TIMEOUT", DB_POOL_TIMEOUT),
+    pool_recycle=_env_int("DB_POOL_RECYCLE", DB_POOL_RECYCLE),
+    pool_pre_ping=_env_bool("DB_POOL_PRE_PING", DB_POOL_PRE_PING),
+    connect_args={
+        # asyncpg's own statement cache, and SQLAlchemy's adapter-level one.
+        "statement_cache_size": _env_int(
+            "DB_STATEMENT_CACHE_SIZE", DB_STATEMENT_CACHE_SIZE
+        ),
+        "prepared_statement_cache_size": _env_int(
+            "DB_STATEMENT_CACHE_SIZE", DB_STATEMENT_CACHE_SIZE
+        ),
+    },
+)
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _record_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.set_max("db_pool_checked_out_max", engine.sync_engine.pool.checkedout())
+
+
+class WorkloadSession(Session):
+    """Session that applies its workload's statement_timeout to every transaction."""
+
+
+@event.listens_for(WorkloadSession, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    timeout = session.info.get("statement_timeout")
+    if timeout:
+        # Transaction-local, so it never leaks to the connection's next user.
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"),
+            {"timeout": str(timeout)},
+        )
+
+
 AsyncSessionLocal = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=WorkloadSession,
+    expire_on_commit=False,
 )
 
-Base = declarative_base()
+
+def statement_timeout(workload):
+    """statement_timeout (ms) for `workload`, overridable via DB_TIMEOUT_<WORKLOAD>."""
+    default = DB_STATEMENT_TIMEOUTS.get(workload, DB_STATEMENT_TIMEOUTS["default"])
+    return _env_int(f"DB_TIMEOUT_{workload.upper()}", default)
+
+
+@asynccontextmanager
+async def get_session(workload="default"):
+    """Open an async session whose transactions run under `workload`'s timeout."""
+    async with AsyncSessionLocal(
+        info={"statement_timeout": statement_timeout(workload)}
+    ) as session:
+        yield session
+
+
+# Synchronous engine for the read-only HTTP API (psycopg2). Created on first
+# use so the async scripts don't need a sync URL configured.
+SYNC_DATABASE_URL = os.getenv("SYNC_DATABASE_URL") or os.getenv("ALEMBIC_SYNC_DB_URL")
+
+_sync_engine = None
+
+
+def get_sync_engine():
+    global _sync_engine
+    if _sync_engine is None:
+        if not SYNC_DATABASE_URL:
+            raise RuntimeError("SYNC_DATABASE_URL not found in .env")
+        timeout = statement_timeout("api")
+        _sync_engine = create_engine(
+            SYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            connect_args={"options": f"-c statement_timeout={timeout}"},
+        )
+    return _sync_engine
@@ -0,0 +1,165 @@
+import asyncio
+import httpx
+
+from app.rate_limiter import HostRateLimiters, backoff_delay, parse_retry_after
+from config import (
+    TIMEOUT,
+    HTTP_MAX_RETRIES,
+    RETRY_AFTER_MAX,
+    HTTP2_ENABLED,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+)
+
+_client = None
+
+
+class HttpClient:
+    """
+    A long-lived, pooled httpx client shared by the scraping scripts.
+
+    Connections are kept alive between requests so the TCP+TLS handshake to
+    bdvtrading.com is paid once per pooled connection rather than once per
+    page. The client counts requests and newly opened connections so the
+    amount of reuse can be checked at the end of a crawl.
+
+    Every request also goes through a per-host adaptive rate limiter, and
+    429/5xx responses and connection errors are retried with jittered
+    exponential backoff (or the server's Retry-After) before giving up.
+    """
+
+    def __init__(
+        self,
+        http2=HTTP2_ENABLED,
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        timeout=TIMEOUT,
+        headers=None,
+    ):
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1.")
+                http2 = False
+
+        self.http2 = http2
+        self.requests = 0
+        self.connections_opened = 0
+        self.retries = 0
+        self.rate_limiters = HostRateLimiters()
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+    async def _trace(self, event_name, info):
+        """httpcore trace hook; counts every new TCP connection."""
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def get(
+        self, url, headers=None, referer=None, max_retries=HTTP_MAX_RETRIES, **kwargs
+    ):
+        """
+        Send a GET request with optional per-request headers and Referer.
+
+        After `max_retries` failed retries the last 429/5xx response is
+        returned (for the caller's raise_for_status) or the last connection
+        error is raised.
+        """
+        headers = dict(headers) if headers else {}
+        if referer:
+            headers["Referer"] = referer
+        limiter = self.rate_limiters.for_url(url)
+
+        for attempt in range(max_retries + 1):
+            await limiter.acquire()
+            self.requests += 1
+            try:
+                response = await self._client.get(
+                    url, headers=headers, extensions={"trace": self._trace}, **kwargs
+                )
+            except httpx.TransportError as e:
+                limiter.on_throttle()
+                if attempt == max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"{e!r} for {url}; retrying in {delay:.1f}s.")
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    limiter.on_success()
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    retry_after = min(retry_after, RETRY_AFTER_MAX)
+                limiter.on_throttle(retry_after)
+                if attempt == max_retries:
+                    return response
+                delay = retry_after
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                print(
+                    f"HTTP {response.status_code} for {url}; retrying in {delay:.1f}s."
+                )
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """Return request and connection counters for this client."""
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "http2": self.http2,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "requests_on_reused_connections": reused,
+            "reuse_ratio": (reused / self.requests) if self.requests else 0.0,
+            "retries": self.retries,
+            "hosts": {
+                host: {"rate": limiter.rate, "throttled": limiter.throttled}
+                for host, limiter in self.rate_limiters.items()
+            },
+        }
+
+    def report(self):
+        """Print connection reuse stats."""
+        stats = self.stats()
+        print(
+            f"HTTP client ({'HTTP/2' if stats['http2'] else 'HTTP/1.1'}): "
+            f"{stats['requests']} requests over {stats['connections_opened']} "
+            f"connections ({stats['reuse_ratio'] * 100:.1f}% reused), "
+            f"{stats['retries']} retries."
+        )
+        for host, limiter in stats["hosts"].items():
+            print(
+                f"Rate limit for {host}: settled at {limiter['rate']:.2f} req/s, "
+                f"throttled {limiter['throttled']} times."
+            )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def get_client():
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = HttpClient()
+    return _client
+
+
+async def close_client():
+    """Close the shared client (if one was created) and print its stats."""
+    global _client
+    if _client is not None:
+        _client.report()
+        await _client.aclose()
+        _client = None
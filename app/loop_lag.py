@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from config import LOOP_LAG_INTERVAL
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic wake-up actually runs.
+
+    A healthy loop wakes within a millisecond or so of the requested
+    interval; large values mean something (usually CPU-bound work such as
+    parsing) is blocking every other in-flight fetch and DB write.
+    """
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.samples.append(max(lag, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        """Return mean/p99/max lag in milliseconds."""
+        if not self.samples:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "samples": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"Event-loop lag: mean {stats['mean_ms']:.1f} ms, "
+            f"p99 {stats['p99_ms']:.1f} ms, max {stats['max_ms']:.1f} ms "
+            f"over {stats['samples']} samples."
+        )
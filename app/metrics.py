@@ -0,0 +1,237 @@
+import bisect
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from config import METRICS_FORMAT, METRICS_DIR, PROFILER
+
+try:
+    import pyinstrument
+except ImportError:  # pyinstrument is optional; cProfile is always available.
+    pyinstrument = None
+
+# Histogram buckets: durations in seconds, and row counts per batch.
+SECONDS_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+ROWS_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms for one run of a script.
+
+    Series are keyed by metric name plus labels (e.g. seller). Everything is
+    kept in memory and exported once at the end of the run, as a Prometheus
+    text file (for node_exporter's textfile collector) or a JSON summary.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        self.gauges[self._key(name, labels)] = value
+
+    def set_max(self, name, value, **labels):
+        key = self._key(name, labels)
+        self.gauges[key] = max(self.gauges.get(key, value), value)
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the wall time of the `with` block into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ""
+        escaped = (
+            (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in pairs
+        )
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def to_prometheus(self):
+        """Render every series in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), value in sorted(self.gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            header(name, "histogram")
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{name}_bucket{self._labels(labels, [('le', le)])} {count}"
+                )
+            lines.append(f"{name}_sum{self._labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        """Summarise every series as plain dicts (histograms as count/sum/mean)."""
+
+        def series(items, render):
+            out = {}
+            for (name, labels), value in sorted(items):
+                out.setdefault(name, []).append(
+                    {"labels": dict(labels), **render(value)}
+                )
+            return out
+
+        return {
+            "counters": series(self.counters.items(), lambda v: {"value": v}),
+            "gauges": series(self.gauges.items(), lambda v: {"value": v}),
+            "histograms": series(
+                self.histograms.items(),
+                lambda h: {
+                    "count": h.count,
+                    "sum": h.sum,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    "buckets": {str(b): c for b, c in h.cumulative()},
+                },
+            ),
+        }
+
+    def write(self, job, fmt=METRICS_FORMAT, directory=METRICS_DIR):
+        """Write `<directory>/<job>.prom` or `.json`; returns the path (or None if off)."""
+        if fmt == "off":
+            return None
+        if fmt == "prometheus":
+            path, body = os.path.join(directory, f"{job}.prom"), self.to_prometheus()
+        elif fmt == "json":
+            path, body = os.path.join(directory, f"{job}.json"), json.dumps(
+                self.to_json(), indent=2
+            )
+        else:
+            raise ValueError(f"Unknown metrics format {fmt!r}")
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False
+        ) as f:
+            f.write(body)
+        os.chmod(
+            f.name, 0o644
+        )  # NamedTemporaryFile is 0600; collectors may run as another user.
+        # Atomic, so a textfile collector never reads a half-written file.
+        os.replace(f.name, path)
+        print(f"Wrote {fmt} metrics to {path}.")
+        return path
+
+
+metrics = Metrics()
+
+
+def safe_filename(name):
+    """`name` with every character but letters, digits and -_. replaced by _."""
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+
+
+@asynccontextmanager
+async def profiled(label, profiler=PROFILER, directory=METRICS_DIR):
+    """
+    Profile the awaited work inside the block with cProfile or pyinstrument
+    and save the report under `directory`. Meant to wrap a single seller
+    that runs on its own, so other tasks don't pollute the profile.
+    """
+    os.makedirs(directory, exist_ok=True)
+    safe_label = safe_filename(label)
+    if profiler == "pyinstrument" and pyinstrument is None:
+        print("pyinstrument is not installed; profiling with cProfile.")
+        profiler = "cprofile"
+
+    if profiler == "pyinstrument":
+        session = pyinstrument.Profiler(async_mode="enabled")
+        session.start()
+        try:
+            yield
+        finally:
+            session.stop()
+            path = os.path.join(directory, f"profile_{safe_label}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(session.output_html())
+            print(f"Saved pyinstrument profile to {path}.")
+    elif profiler == "cprofile":
+        session = cProfile.Profile()
+        session.enable()
+        try:
+            yield
+        finally:
+            session.disable()
+            path = os.path.join(directory, f"profile_{safe_label}.pstats")
+            session.dump_stats(path)
+            print(f"Saved cProfile stats to {path}; top functions by cumulative time:")
+            pstats.Stats(session).sort_stats("cumulative").print_stats(15)
+    else:
+        raise ValueError(f"Unknown profiler {profiler!r}")
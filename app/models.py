@@ -3,17 +3,22 @@ import uuid
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     Text,
     Float,
     Boolean,
     DateTime,
     ForeignKey,
+    Identity,
     ARRAY,
+    Index,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import relationship, declarative_base
 
+# The project's single declarative base; app.db re-exports it.
 Base = declarative_base()
 
 
@@ -35,6 +40,16 @@ class Seller(Base):
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        Index("ix_cards_name", "name"),
+        # Trigram index for fuzzy name search; requires the pg_trgm extension.
+        Index(
+            "ix_cards_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     scryfall_id = Column(
@@ -50,6 +65,8 @@ class Card(Base):
     )  # List of card types, e.g. ["Creature", "Legendary"]
     power = Column(Text, nullable=True)
     toughness = Column(Text, nullable=True)
+    # 64-bit hash of the mapped Scryfall fields, used to skip unchanged cards on re-import.
+    content_hash = Column(BigInteger, nullable=True)
 
     # A card can be listed by multiple sellers.
     listings = relationship(
@@ -62,6 +79,23 @@ class Card(Base):
 
 class Listing(Base):
     __tablename__ = "listings"
+    __table_args__ = (
+        Index("ix_listings_card_id_price", "card_id", "price"),
+        Index("ix_listings_seller_id_last_seen", "seller_id", "last_seen"),
+        # Partial indexes covering only in-stock rows, for offer lookups.
+        Index(
+            "ix_listings_in_stock_card_id_price",
+            "card_id",
+            "price",
+            postgresql_where=text("quantity > 0"),
+        ),
+        Index(
+            "ix_listings_in_stock_seller_id_card_id",
+            "seller_id",
+            "card_id",
+            postgresql_where=text("quantity > 0"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     bdv_listing_id = Column(Integer, nullable=False, unique=True)
@@ -79,6 +113,8 @@ class Listing(Base):
     foil = Column(Boolean, default=False)
     language = Column(Text, nullable=False)
     last_seen = Column(DateTime, default=datetime.utcnow)
+    # Set when the listing vanished from its seller's store (soft delete).
+    removed_at = Column(DateTime, nullable=True)
 
     # Relationships: each listing is associated with one seller and one card.
     seller = relationship("Seller", back_populates="listings")
@@ -86,3 +122,107 @@ class Listing(Base):
 
     def __repr__(self):
         return f"<Listing(seller_id={self.seller_id}, card_id={self.card_id}, price={self.price})>"
+
+
+class CrawlState(Base):
+    __tablename__ = "crawl_state"
+
+    # One row per seller, recording the progress of its latest store crawl.
+    seller_id = Column(
+        Integer, ForeignKey("sellers.id", ondelete="CASCADE"), primary_key=True
+    )
+    status = Column(Text, nullable=False)  # "running", "complete" or "failed"
+    last_completed_page = Column(Integer, nullable=False, default=0)
+    page_count = Column(Integer, nullable=True)
+    # Store size and finish time of the last complete crawl; a running or
+    # failed crawl keeps them, and tracks its own progress in listings_written.
+    listing_count = Column(Integer, nullable=False, default=0)
+    listings_written = Column(Integer, nullable=False, server_default="0")
+    # Content hash of page 1 from the last complete crawl.
+    fingerprint = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CrawlState(seller_id={self.seller_id}, status={self.status}, last_completed_page={self.last_completed_page})>"
+
+
+class ListingPriceHistory(Base):
+    __tablename__ = "listing_price_history"
+    __table_args__ = (
+        # Price history is only ever read per card, over a time range.
+        Index("ix_listing_price_history_card_id_observed_at", "card_id", "observed_at"),
+    )
+
+    # Append-only; rows are written by a trigger on listings whenever a
+    # listing is inserted or its price or quantity changes. No foreign keys,
+    # so history outlives deleted listings.
+    id = Column(BigInteger, Identity(), primary_key=True)
+    listing_id = Column(Integer, nullable=False)
+    seller_id = Column(Integer, nullable=False)
+    card_id = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    observed_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ListingPriceHistory(listing_id={self.listing_id}, price={self.price}, observed_at={self.observed_at})>"
+
+
+class CardOfferSummary(Base):
+    __tablename__ = "card_offer_summary"
+
+    # Cheapest live, in-stock offer and totals per card variant. Maintained
+    # incrementally by app.offers.refresh_offer_summary for the cards each
+    # upsert touches.
+    card_id = Column(Integer, primary_key=True)
+    condition = Column(Text, primary_key=True)
+    foil = Column(Boolean, primary_key=True)
+    language = Column(Text, primary_key=True)
+    min_price = Column(Float, nullable=False)
+    min_seller_id = Column(Integer, nullable=False)
+    min_listing_id = Column(Integer, nullable=False)
+    total_quantity = Column(Integer, nullable=False)
+    offer_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CardOfferSummary(card_id={self.card_id}, condition={self.condition}, min_price={self.min_price})>"
+
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+
+    # A single row whose version is bumped whenever a scrape commits new
+    # data; API response caches compare against it to invalidate.
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DataVersion(version={self.version}, updated_at={self.updated_at})>"
+
+
+class CrawlJob(Base):
+    __tablename__ = "crawl_jobs"
+    __table_args__ = (
+        # Workers lease the lowest-priority-number runnable job first.
+        Index("ix_crawl_jobs_status_priority", "status", "priority"),
+    )
+
+    # Work queue for distributed crawls: one row per seller, leased by a
+    # worker with SELECT ... FOR UPDATE SKIP LOCKED.
+    seller_id = Column(
+        Integer, ForeignKey("sellers.id", ondelete="CASCADE"), primary_key=True
+    )
+    status = Column(Text, nullable=False)  # "pending", "leased", "done" or "failed"
+    priority = Column(Integer, nullable=False, default=0)
+    lease_owner = Column(Text, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CrawlJob(seller_id={self.seller_id}, status={self.status}, lease_owner={self.lease_owner})>"
@@ -0,0 +1,115 @@
+import difflib
+import re
+import unicodedata
+from sqlalchemy import text
+
+from config import NAME_MATCH_FUZZY, NAME_MATCH_MIN_SIMILARITY
+
+# Trailing "(M10)", "[Foil]", "- Borderless" style decorations added by stores.
+SUFFIX_RE = re.compile(r"\s*(\([^()]*\)|\[[^\[\]]*\]|\s-\s[^/]*)\s*$")
+NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+# Closest card name for each of several names, via the pg_trgm index. The
+# similarity cut-off is applied by the caller.
+FUZZY_MATCH_SQL = """
+SELECT q.name, c.id, c.name AS match, similarity(c.name, q.name) AS score
+FROM unnest(CAST(:names AS text[])) AS q(name)
+CROSS JOIN LATERAL (
+    SELECT id, name FROM cards
+    WHERE name % q.name
+    ORDER BY similarity(name, q.name) DESC, id
+    LIMIT 1
+) c;
+"""
+
+
+def normalize_name(name):
+    """Casefold, strip accents and punctuation, and collapse whitespace."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.casefold().replace("æ", "ae").replace("&", " and ")
+    return NON_ALNUM_RE.sub(" ", name).strip()
+
+
+def faces(name):
+    """The faces of a split / double-faced card name ("A // B" -> A, B)."""
+    return [face.strip() for face in re.split(r"\s*//?\s*", name) if face.strip()]
+
+
+def candidate_keys(name):
+    """Normalised keys to try for a scraped name, most specific first."""
+    keys = []
+    base = name
+    while True:
+        stripped = SUFFIX_RE.sub("", base)
+        for candidate in (base, *faces(base)):
+            key = normalize_name(candidate)
+            if key and key not in keys:
+                keys.append(key)
+        if stripped == base or not stripped:
+            break
+        base = stripped
+    return keys
+
+
+class NameIndex:
+    """
+    Normalised-name index over the cards table: each card name and each of
+    its faces, normalised, mapped to a card id. Full names win over faces
+    when two cards would share a key.
+    """
+
+    def __init__(self):
+        self._ids = {}
+
+    @classmethod
+    async def load(cls, session):
+        index = cls()
+        result = await session.execute(
+            text("SELECT DISTINCT ON (name) name, id FROM cards ORDER BY name, id")
+        )
+        face_keys = []
+        for name, card_id in result:
+            index._ids.setdefault(normalize_name(name), card_id)
+            if "/" in name:
+                face_keys.extend((face, card_id) for face in faces(name))
+        for face, card_id in face_keys:
+            index._ids.setdefault(normalize_name(face), card_id)
+        print(f"Built normalised name index with {len(index._ids)} keys.")
+        return index
+
+    def __len__(self):
+        return len(self._ids)
+
+    def lookup(self, name):
+        """Return the card id for a scraped name, or None."""
+        for key in candidate_keys(name):
+            card_id = self._ids.get(key)
+            if card_id is not None:
+                return card_id
+        return None
+
+
+async def fuzzy_match_many(session, names, min_similarity=NAME_MATCH_MIN_SIMILARITY):
+    """
+    Return {name: card_id} for the names whose closest trigram match is
+    similar enough, confirmed by an edit-distance ratio on the normalised
+    names. Names without an acceptable match are left out.
+    """
+    if not NAME_MATCH_FUZZY or not names:
+        return {}
+    # Match on the name without store decorations.
+    queries = {}
+    for name in names:
+        query = SUFFIX_RE.sub("", name) or name
+        queries.setdefault(query, []).append(name)
+    result = await session.execute(text(FUZZY_MATCH_SQL), {"names": list(queries)})
+    matched = {}
+    for query, card_id, match, score in result:
+        ratio = difflib.SequenceMatcher(
+            None, normalize_name(query), normalize_name(match)
+        ).ratio()
+        if score >= min_similarity and ratio >= min_similarity:
+            for name in queries[query]:
+                matched[name] = card_id
+    return matched
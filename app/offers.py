@@ -0,0 +1,124 @@
+from datetime import datetime
+from sqlalchemy import text
+
+# Aggregate the live, in-stock listings of the given cards per variant. The
+# cheapest listing (ties broken by id) supplies min_seller_id/min_listing_id.
+# Rows are produced in key order so concurrent refreshes lock them in the
+# same order.
+UPSERT_OFFER_SUMMARY_SQL = """
+INSERT INTO card_offer_summary (card_id, condition, foil, language, min_price,
+    min_seller_id, min_listing_id, total_quantity, offer_count, updated_at)
+SELECT card_id, condition, COALESCE(foil, false), language,
+       min(price),
+       (array_agg(seller_id ORDER BY price, id))[1],
+       (array_agg(id ORDER BY price, id))[1],
+       sum(quantity),
+       count(*),
+       :now
+FROM listings
+WHERE card_id = ANY(:card_ids) AND quantity > 0 AND removed_at IS NULL
+GROUP BY card_id, condition, COALESCE(foil, false), language
+ORDER BY card_id, condition, COALESCE(foil, false), language
+ON CONFLICT (card_id, condition, foil, language) DO UPDATE
+SET min_price = EXCLUDED.min_price,
+    min_seller_id = EXCLUDED.min_seller_id,
+    min_listing_id = EXCLUDED.min_listing_id,
+    total_quantity = EXCLUDED.total_quantity,
+    offer_count = EXCLUDED.offer_count,
+    updated_at = EXCLUDED.updated_at;
+"""
+
+# Serialise refreshes of the same card across writers by locking the card
+# rows, in id order (so two writers can't deadlock), before aggregating.
+# The locks are held until the holder commits, so under READ COMMITTED the
+# next writer's aggregate sees the previous writer's listings instead of
+# overwriting its summary. Row locks live in the tuples, not the shared lock
+# table, so a 1000-card batch can't exhaust it; FOR NO KEY UPDATE doesn't
+# block the KEY SHARE locks that listing inserts take on their card.
+LOCK_OFFER_SUMMARY_SQL = """
+SELECT 1 FROM cards
+WHERE id = ANY(:card_ids)
+ORDER BY id
+FOR NO KEY UPDATE;
+"""
+
+# Drop variants of those cards that no longer have any live offer.
+DELETE_EMPTY_OFFER_SUMMARY_SQL = """
+DELETE FROM card_offer_summary s
+WHERE s.card_id = ANY(:card_ids)
+  AND NOT EXISTS (
+    SELECT 1 FROM listings l
+    WHERE l.card_id = s.card_id
+      AND l.condition = s.condition
+      AND COALESCE(l.foil, false) = s.foil
+      AND l.language = s.language
+      AND l.quantity > 0
+      AND l.removed_at IS NULL
+  );
+"""
+
+CHEAPEST_OFFERS_SQL = """
+SELECT s.card_id, c.name AS card_name, c.set_name, s.condition, s.foil,
+       s.language, s.min_price, s.min_seller_id, sel.name AS seller_name,
+       s.min_listing_id, s.total_quantity, s.offer_count, s.updated_at
+FROM card_offer_summary s
+JOIN cards c ON c.id = s.card_id
+JOIN sellers sel ON sel.id = s.min_seller_id
+WHERE {where}
+ORDER BY s.min_price, s.card_id
+LIMIT :limit;
+"""
+
+OFFER_FILTERS = ("condition", "foil", "language")
+
+
+async def refresh_offer_summary(session, card_ids):
+    """
+    Recompute the offer summary rows of `card_ids` from their listings.
+
+    Runs in the caller's transaction (no commit), so the summary changes
+    together with the listings it describes. The cards stay locked against
+    other refreshes until that transaction ends.
+    """
+    card_ids = sorted(set(card_ids))
+    if not card_ids:
+        return
+    await session.execute(text(LOCK_OFFER_SUMMARY_SQL), {"card_ids": card_ids})
+    params = {"card_ids": card_ids, "now": datetime.utcnow()}
+    await session.execute(text(UPSERT_OFFER_SUMMARY_SQL), params)
+    await session.execute(text(DELETE_EMPTY_OFFER_SUMMARY_SQL), params)
+
+
+def cheapest_offers_query(card_ids=None, card_name=None, limit=20, **filters):
+    """
+    Build the (sql, params) for a cheapest-offer lookup by card ids or by
+    exact card name (all printings), optionally narrowed by condition,
+    foil and language.
+    """
+    if (card_ids is None) == (card_name is None):
+        raise ValueError("Pass exactly one of card_ids or card_name")
+    if card_ids is not None:
+        clauses = ["s.card_id = ANY(:card_ids)"]
+        params = {"card_ids": list(card_ids)}
+    else:
+        clauses = ["c.name = :card_name"]
+        params = {"card_name": card_name}
+    for field in OFFER_FILTERS:
+        value = filters.pop(field, None)
+        if value is not None:
+            clauses.append(f"s.{field} = :{field}")
+            params[field] = value
+    if filters:
+        raise TypeError(f"Unknown offer filters: {sorted(filters)}")
+    params["limit"] = limit
+    return CHEAPEST_OFFERS_SQL.format(where=" AND ".join(clauses)), params
+
+
+async def cheapest_offers(session, card_ids=None, card_name=None, limit=20, **filters):
+    """
+    Return the cheapest offer per card variant, cheapest first, as a list
+    of row mappings. Reads only the precomputed summary table.
+    """
+    sql, params = cheapest_offers_query(card_ids, card_name, limit, **filters)
+    result = await session.execute(text(sql), params)
+    return [dict(row) for row in result.mappings()]
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+from app.metrics import safe_filename
+from config import PAGE_CACHE_PATH, PAGE_CACHE_MAX_BYTES
+
+
+def worker_cache_path(worker_id, path=PAGE_CACHE_PATH):
+    """A page cache path of its own for one worker, e.g. page_cache.<worker>.json."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{safe_filename(worker_id)}{ext}"
+
+
+def content_hash(html, pagination_html):
+    """Return a short hex digest identifying a page's payload."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(html.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(pagination_html.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PageCache:
+    """
+    Per-(seller, page) record of the last crawl of each store search page.
+
+    Each entry keeps the HTTP validators (ETag / Last-Modified) for a
+    conditional request, a hash of the page payload, and the page's
+    pagination info so an unchanged page can be skipped without parsing it.
+    Entries are kept in LRU order and the least recently used ones are
+    evicted once the serialised cache grows past `max_bytes`.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.changed = 0
+        self.evicted = 0
+        self._load()
+
+    @staticmethod
+    def _key(seller_name, page):
+        return f"{seller_name}|{page}"
+
+    @staticmethod
+    def _entry_size(key, entry):
+        return len(key) + len(json.dumps(entry))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable page cache {self.path}: {e}")
+            return
+        for key, entry in entries.items():
+            self._entries[key] = entry
+            self._size += self._entry_size(key, entry)
+        print(f"Loaded {len(self._entries)} cached pages from {self.path}.")
+
+    def get(self, seller_name, page):
+        """Return the cached entry for a page, or None."""
+        key = self._key(seller_name, page)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Return If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, seller_name, page, entry):
+        """Store (or replace) a page's entry and evict old entries if needed."""
+        key = self._key(seller_name, page)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= self._entry_size(key, old)
+        self._entries[key] = entry
+        self._size += self._entry_size(key, entry)
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._size -= self._entry_size(old_key, old_entry)
+            self.evicted += 1
+
+    def save(self):
+        """Write the cache to disk atomically."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        # A unique temporary file, so concurrent savers never share one.
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=directory,
+            prefix=os.path.basename(self.path) + ".",
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(f.name, self.path)
+
+    def report(self):
+        """Print how many pages were skipped thanks to the cache."""
+        print(
+            f"Page cache: {self.not_modified} not modified (304), "
+            f"{self.unchanged} unchanged by content hash, {self.changed} changed or new, "
+            f"{len(self._entries)} entries (~{self._size // 1024} KiB), "
+            f"{self.evicted} evicted."
+        )
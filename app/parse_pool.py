@@ -0,0 +1,64 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.parsing import parse_page_compact
+from config import PARSE_EXECUTOR, PARSE_WORKERS
+
+_pool = None
+
+
+class ParsePool:
+    """
+    Runs page parsing off the event loop.
+
+    `mode` is "process" (a ProcessPoolExecutor; sidesteps the GIL), "thread"
+    (a ThreadPoolExecutor; enough when the parser releases the GIL) or
+    "inline" (parse on the event loop, as before). Only the raw html and
+    pagination_html strings are sent to a worker, and listings come back as
+    ListingRecords.
+    """
+
+    def __init__(self, mode=PARSE_EXECUTOR, workers=PARSE_WORKERS):
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        elif mode == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="parse"
+            )
+        elif mode == "inline":
+            self._executor = None
+        else:
+            raise ValueError(f"Unknown parse executor {mode!r}")
+
+    async def parse(self, html, pagination_html):
+        """Return (listings, has_next, page_count) for a page."""
+        if self._executor is None:
+            return parse_page_compact(html, pagination_html)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, parse_page_compact, html, pagination_html
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+def get_parse_pool():
+    """Return the shared parse pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ParsePool()
+        print(f"Parsing pages with {_pool.mode} executor ({_pool.workers} workers).")
+    return _pool
+
+
+def close_parse_pool():
+    """Shut down the shared parse pool, if one was created."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
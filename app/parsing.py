@@ -0,0 +1,332 @@
+import re
+import sys
+from typing import NamedTuple, Optional
+from bs4 import BeautifulSoup
+
+from config import PARSER_BACKEND
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # lxml is optional; the bs4 backend is always available.
+    lxml = None
+
+PAGE_PARAM_RE = re.compile(r"page=(\d+)")
+
+
+class ListingRecord(NamedTuple):
+    """
+    One parsed listing, carried unchanged from the parser to the DB writer.
+
+    A NamedTuple has no per-instance __dict__, so a record costs one small
+    tuple rather than a dict with eight keys. Only the fields that are
+    stored are kept.
+    """
+
+    bdv_listing_id: Optional[int]
+    card_name: Optional[str]
+    price: Optional[float]
+    quantity: int
+    condition: str
+    language: str
+    foil: bool = False  # Default to False unless specified otherwise
+
+
+def make_listing(
+    bdv_listing_id, card_name, price_text, quantity_text, condition, language
+):
+    """
+    Build a ListingRecord from the text extracted by a parser backend.
+
+    Condition and language take a handful of values, so they are interned
+    and every record shares one string object per value.
+    """
+    return ListingRecord(
+        bdv_listing_id,
+        card_name,
+        float(price_text.replace("$", "")) if price_text else None,
+        int(quantity_text),
+        sys.intern(condition),
+        sys.intern(language),
+    )
+
+
+def listing_id_from_span_id(span_id):
+    """Extract the BDV listing id from a 'product-quantity-<id>' span id."""
+    id_parts = span_id.split("-")
+    if id_parts and len(id_parts) >= 3:
+        return int(id_parts[-1])
+    return None
+
+
+def language_from_classes(classes):
+    """Return the language code from a flag icon's 'flag-icon-<code>' class."""
+    for cls in classes:
+        if cls.startswith("flag-icon-"):
+            return cls.replace("flag-icon-", "")
+    return "unknown"
+
+
+def page_count_from_links(links):
+    """
+    Return the highest page number among (text, data-page, href) link
+    triples, or None if there is none.
+    """
+    page_numbers = []
+    for link_text, data_page, href in links:
+        if link_text.isdigit():
+            page_numbers.append(int(link_text))
+        if data_page.isdigit():
+            page_numbers.append(int(data_page))
+        match = PAGE_PARAM_RE.search(href)
+        if match:
+            page_numbers.append(int(match.group(1)))
+    return max(page_numbers) if page_numbers else None
+
+
+class Bs4Backend:
+    """Reference backend: BeautifulSoup with the pure-Python html.parser."""
+
+    name = "bs4"
+
+    def parse_listing_html(self, html):
+        """Parse the HTML (from the 'html' key) and extract listing details."""
+        soup = BeautifulSoup(html, "html.parser")
+        listings = []
+        product_cards = soup.find_all(
+            "div", class_="product-card"
+        )  # adjust selector as needed
+        for card in product_cards:
+            try:
+                card_link = card.find("a", class_="card-link")
+                card_name = card_link.get_text(strip=True) if card_link else None
+
+                quantity_span = card.find(
+                    "span", id=lambda x: x and x.startswith("product-quantity-")
+                )
+                bdv_listing_id = None
+                if quantity_span and "id" in quantity_span.attrs:
+                    bdv_listing_id = listing_id_from_span_id(quantity_span["id"])
+
+                price_div = card.find("div", class_="price")
+                price_text = price_div.get_text(strip=True) if price_div else ""
+
+                quantity_text = (
+                    quantity_span.get_text(strip=True) if quantity_span else "0"
+                )
+
+                condition_div = card.find("div", class_="condition")
+                condition = (
+                    condition_div.get_text(strip=True) if condition_div else "N/A"
+                )
+
+                language_div = card.find("div", class_="language")
+                language = "unknown"
+                if language_div:
+                    flag_icon = language_div.find("i")
+                    if flag_icon and flag_icon.has_attr("class"):
+                        language = language_from_classes(flag_icon["class"])
+
+                listings.append(
+                    make_listing(
+                        bdv_listing_id,
+                        card_name,
+                        price_text,
+                        quantity_text,
+                        condition,
+                        language,
+                    )
+                )
+            except Exception as e:
+                print(f"Error parsing a product card: {e}")
+        return listings
+
+    def parse_pagination(self, pagination_html):
+        """Return (has_next, page_count) from the pagination HTML in one parse."""
+        soup = BeautifulSoup(pagination_html, "html.parser")
+        has_next = False
+        links = []
+        for link in soup.find_all("a"):
+            link_string = link.string
+            if link_string and link_string.strip().lower() == "next":
+                has_next = True
+            links.append(
+                (
+                    link.get_text(strip=True),
+                    str(link.get("data-page", "")),
+                    str(link.get("href", "")),
+                )
+            )
+        return has_next, page_count_from_links(links)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _lxml_text(element):
+    """Equivalent of bs4's get_text(strip=True): stripped text nodes, joined."""
+    return "".join(text.strip() for text in _text_nodes(element))
+
+
+def _lxml_string(element):
+    """Equivalent of bs4's Tag.string: the tag's only string, or None."""
+    children = list(element)
+    if not children:
+        return element.text
+    if len(children) == 1 and element.text is None and children[0].tail is None:
+        if isinstance(children[0].tag, str):
+            return _lxml_string(children[0])
+    return None
+
+
+if lxml is not None:
+    _text_nodes = lxml.etree.XPath(".//text()")
+
+
+class LxmlBackend:
+    """Fast backend: libxml2's HTML parser via lxml, with XPath lookups."""
+
+    name = "lxml"
+
+    def __init__(self):
+        # XPath expressions are compiled once and reused for every page.
+        self._product_cards = lxml.etree.XPath(f".//div[{_has_class('product-card')}]")
+        self._card_link = lxml.etree.XPath(f".//a[{_has_class('card-link')}]")
+        self._quantity_span = lxml.etree.XPath(
+            ".//span[starts-with(@id, 'product-quantity-')]"
+        )
+        self._price_div = lxml.etree.XPath(f".//div[{_has_class('price')}]")
+        self._condition_div = lxml.etree.XPath(f".//div[{_has_class('condition')}]")
+        self._language_div = lxml.etree.XPath(f".//div[{_has_class('language')}]")
+        self._flag_icon = lxml.etree.XPath(".//i")
+        self._links = lxml.etree.XPath(".//a")
+
+    @staticmethod
+    def _fragment(html):
+        if not html or not html.strip():
+            return None
+        return lxml.html.fragment_fromstring(html, create_parent="div")
+
+    @staticmethod
+    def _first(element, xpath):
+        found = xpath(element)
+        return found[0] if found else None
+
+    def parse_listing_html(self, html):
+        """Parse the HTML (from the 'html' key) and extract listing details."""
+        root = self._fragment(html)
+        if root is None:
+            return []
+        listings = []
+        for card in self._product_cards(root):
+            try:
+                card_link = self._first(card, self._card_link)
+                card_name = _lxml_text(card_link) if card_link is not None else None
+
+                quantity_span = self._first(card, self._quantity_span)
+                bdv_listing_id = None
+                if quantity_span is not None:
+                    bdv_listing_id = listing_id_from_span_id(quantity_span.get("id"))
+
+                price_div = self._first(card, self._price_div)
+                price_text = _lxml_text(price_div) if price_div is not None else ""
+
+                quantity_text = (
+                    _lxml_text(quantity_span) if quantity_span is not None else "0"
+                )
+
+                condition_div = self._first(card, self._condition_div)
+                condition = (
+                    _lxml_text(condition_div) if condition_div is not None else "N/A"
+                )
+
+                language_div = self._first(card, self._language_div)
+                language = "unknown"
+                if language_div is not None:
+                    flag_icon = self._first(language_div, self._flag_icon)
+                    if flag_icon is not None and flag_icon.get("class") is not None:
+                        classes = flag_icon.get("class").split()
+                        language = language_from_classes(classes)
+
+                listings.append(
+                    make_listing(
+                        bdv_listing_id,
+                        card_name,
+                        price_text,
+                        quantity_text,
+                        condition,
+                        language,
+                    )
+                )
+            except Exception as e:
+                print(f"Error parsing a product card: {e}")
+        return listings
+
+    def parse_pagination(self, pagination_html):
+        """Return (has_next, page_count) from the pagination HTML in one parse."""
+        root = self._fragment(pagination_html)
+        if root is None:
+            return False, None
+        has_next = False
+        links = []
+        for link in self._links(root):
+            link_string = _lxml_string(link)
+            if link_string and link_string.strip().lower() == "next":
+                has_next = True
+            links.append(
+                (_lxml_text(link), link.get("data-page", ""), link.get("href", ""))
+            )
+        return has_next, page_count_from_links(links)
+
+
+BACKENDS = {
+    Bs4Backend.name: Bs4Backend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+
+def get_backend(name=PARSER_BACKEND):
+    """Return a parser backend by name, falling back to bs4 if lxml is missing."""
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown parser backend {name!r}; choose from {list(BACKENDS)}"
+        )
+    if name == LxmlBackend.name and lxml is None:
+        print("lxml is not installed; using the bs4 parser backend.")
+        name = Bs4Backend.name
+    return BACKENDS[name]()
+
+
+_backend = None
+
+
+def default_backend():
+    """Return the configured backend, created on first use."""
+    global _backend
+    if _backend is None:
+        _backend = get_backend()
+    return _backend
+
+
+def parse_listing_html(html):
+    """Parse the HTML (from the 'html' key) with the configured backend."""
+    return default_backend().parse_listing_html(html)
+
+
+def parse_pagination(pagination_html):
+    """Return (has_next, page_count) with the configured backend."""
+    return default_backend().parse_pagination(pagination_html)
+
+
+def parse_page_compact(html, pagination_html):
+    """
+    Parse a whole page and return (records, has_next, page_count). This is
+    the function run in parse worker processes; ListingRecords pickle as
+    little more than their tuple of values, and pickle's memo keeps the
+    interned condition and language strings shared within a page.
+    """
+    backend = default_backend()
+    records = backend.parse_listing_html(html)
+    has_next, page_count = backend.parse_pagination(pagination_html)
+    return records, has_next, page_count
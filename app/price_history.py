@@ -0,0 +1,78 @@
+from datetime import datetime
+from sqlalchemy import text
+
+# Every recorded price point for a card, across all sellers, oldest first.
+# Keyset-paginated on (observed_at, id); a NULL :limit returns every row.
+PRICE_SERIES_SQL = """
+SELECT h.id, h.observed_at, h.seller_id, s.name AS seller_name, h.listing_id,
+       h.price, h.quantity
+FROM listing_price_history h
+JOIN sellers s ON s.id = h.seller_id
+WHERE h.card_id = :card_id
+  AND h.observed_at >= :since
+  AND h.observed_at < :until {keyset}
+ORDER BY h.observed_at, h.id
+LIMIT :limit;
+"""
+
+# The same series rolled up into date_trunc buckets ('hour', 'day', 'week', ...).
+PRICE_SERIES_BUCKETED_SQL = """
+SELECT date_trunc(:bucket, h.observed_at) AS bucket,
+       min(h.price) AS min_price,
+       avg(h.price) AS avg_price,
+       max(h.price) AS max_price,
+       count(DISTINCT h.seller_id) AS sellers
+FROM listing_price_history h
+WHERE h.card_id = :card_id
+  AND h.observed_at >= :since
+  AND h.observed_at < :until
+GROUP BY 1
+ORDER BY 1;
+"""
+
+BUCKETS = ("hour", "day", "week", "month")
+
+
+def series_params(card_id, since=None, until=None, bucket=None):
+    """Bind parameters for the price series queries (open ends become unbounded)."""
+    if bucket is not None and bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}; choose from {list(BUCKETS)}")
+    params = {
+        "card_id": card_id,
+        "since": since or datetime.min,
+        "until": until or datetime.max,
+    }
+    if bucket is not None:
+        params["bucket"] = bucket
+    return params
+
+
+def series_query(card_id, since=None, until=None, bucket=None, after=None, limit=None):
+    """
+    Build the (sql, params) for a price series. Unbucketed series start
+    after the `after` (observed_at, id) key and return at most `limit` rows
+    (all if None); bucketed series are one row per bucket and unpaginated.
+    """
+    params = series_params(card_id, since, until, bucket)
+    if bucket is not None:
+        return PRICE_SERIES_BUCKETED_SQL, params
+    keyset = ""
+    if after is not None:
+        keyset = "AND (h.observed_at, h.id) > (:after_observed_at, :after_id)"
+        params["after_observed_at"], params["after_id"] = after
+    params["limit"] = limit
+    return PRICE_SERIES_SQL.format(keyset=keyset), params
+
+
+async def price_series(session, card_id, since=None, until=None, bucket=None):
+    """
+    Return the price history of a card across all sellers, as a list of
+    row mappings.
+
+    Without `bucket`, each row is one recorded change of a listing's price
+    or quantity. With `bucket` ('hour', 'day', ...), rows are min/avg/max
+    prices per time bucket.
+    """
+    sql, params = series_query(card_id, since, until, bucket)
+    result = await session.execute(text(sql), params)
+    return [dict(row) for row in result.mappings()]
@@ -0,0 +1,115 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from config import (
+    RATE_LIMIT_INITIAL_RPS,
+    RATE_LIMIT_MIN_RPS,
+    RATE_LIMIT_MAX_RPS,
+    RATE_LIMIT_INCREASE,
+    RATE_LIMIT_DECREASE_FACTOR,
+    RATE_LIMIT_BURST,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+)
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt, base=RETRY_BACKOFF_BASE, cap=RETRY_BACKOFF_MAX):
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket rate limiter for one host, with AIMD rate adaptation.
+
+    Every healthy response nudges the rate up additively (by about
+    RATE_LIMIT_INCREASE requests/s per second of successful traffic), while
+    a 429, 5xx or connection error cuts it multiplicatively. A Retry-After
+    from the server pauses the bucket entirely until that time has passed.
+    """
+
+    def __init__(
+        self,
+        rate=RATE_LIMIT_INITIAL_RPS,
+        min_rate=RATE_LIMIT_MIN_RPS,
+        max_rate=RATE_LIMIT_MAX_RPS,
+        increase=RATE_LIMIT_INCREASE,
+        decrease_factor=RATE_LIMIT_DECREASE_FACTOR,
+        burst=RATE_LIMIT_BURST,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        # asyncio.Lock wakes waiters in FIFO order, so requests are served fairly.
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        """Additive increase."""
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease, plus a pause if the server asked for one."""
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+class HostRateLimiters:
+    """One AdaptiveRateLimiter per host, created on demand."""
+
+    def __init__(self):
+        self._limiters = {}
+
+    def for_url(self, url):
+        host = urlsplit(str(url)).netloc
+        if host not in self._limiters:
+            self._limiters[host] = AdaptiveRateLimiter()
+        return self._limiters[host]
+
+    def items(self):
+        return self._limiters.items()
@@ -0,0 +1,90 @@
+from datetime import datetime
+from sqlalchemy import text
+
+from app.db import get_session
+from app.offers import refresh_offer_summary
+from config import RECONCILE_MODE
+
+TOUCH_LISTINGS_SQL = """
+UPDATE listings
+SET last_seen = :now, removed_at = NULL
+WHERE seller_id = :seller_id AND bdv_listing_id = ANY(:listing_ids);
+"""
+
+TOUCH_SELLER_SQL = """
+UPDATE listings
+SET last_seen = :now
+WHERE seller_id = :seller_id AND removed_at IS NULL;
+"""
+
+SOFT_DELETE_VANISHED_SQL = """
+UPDATE listings
+SET removed_at = :now
+WHERE seller_id = :seller_id AND last_seen < :crawl_started_at AND removed_at IS NULL
+RETURNING card_id;
+"""
+
+DELETE_VANISHED_SQL = """
+DELETE FROM listings
+WHERE seller_id = :seller_id AND last_seen < :crawl_started_at
+RETURNING card_id;
+"""
+
+
+async def touch_listings(session, seller_id, listing_ids):
+    """
+    Mark the listings of unchanged pages as seen in this crawl without
+    rewriting them, committing on the seller's writer `session`.
+    """
+    result = await session.execute(
+        text(TOUCH_LISTINGS_SQL),
+        {
+            "now": datetime.utcnow(),
+            "seller_id": seller_id,
+            "listing_ids": listing_ids,
+        },
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def touch_seller(seller_id):
+    """Mark all of a seller's live listings as seen (store found unchanged)."""
+    async with get_session("scrape") as session:
+        result = await session.execute(
+            text(TOUCH_SELLER_SQL), {"now": datetime.utcnow(), "seller_id": seller_id}
+        )
+        await session.commit()
+        return result.rowcount
+
+
+async def reconcile_seller(seller_id, crawl_started_at, mode=RECONCILE_MODE):
+    """
+    After a complete crawl, soft-delete ("soft") or delete ("hard") the
+    seller's listings that were not seen since `crawl_started_at`.
+
+    Returns the number of listings removed ("off" does nothing). The offer
+    summary of the affected cards is refreshed in the same transaction.
+    """
+    if mode == "off":
+        return 0
+    if mode == "soft":
+        sql = SOFT_DELETE_VANISHED_SQL
+    elif mode == "hard":
+        sql = DELETE_VANISHED_SQL
+    else:
+        raise ValueError(f"Unknown reconcile mode {mode!r}")
+
+    async with get_session("scrape") as session:
+        result = await session.execute(
+            text(sql),
+            {
+                "now": datetime.utcnow(),
+                "seller_id": seller_id,
+                "crawl_started_at": crawl_started_at,
+            },
+        )
+        card_ids = result.scalars().all()
+        await refresh_offer_summary(session, card_ids)
+        await session.commit()
+        return len(card_ids)
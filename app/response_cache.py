@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import API_CACHE_SIZE, API_CACHE_TTL
+
+
+class ResponseCache:
+    """
+    LRU cache of rendered API responses with a TTL.
+
+    Every entry is tagged with the data version it was rendered under;
+    `set_version` drops everything once a scrape has committed new data, so
+    the TTL only bounds staleness between version checks. An entry rendered
+    under an older version than the current one is never stored or served,
+    so a response that was in flight across an invalidation can't outlive it.
+    """
+
+    def __init__(self, max_entries=API_CACHE_SIZE, ttl=API_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # The API is served by a threaded WSGI server.
+        self._lock = threading.Lock()
+
+    def set_version(self, version):
+        """Adopt the current data version, clearing the cache if it changed."""
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        """Return the cached (etag, body) for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != self.version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, version):
+        """Cache `value`, rendered under data `version` (read before rendering)."""
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "version": self.version,
+        }
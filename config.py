@@ -1,7 +1,6 @@
 # API and HTTP settings
 TIMEOUT = 30
 MAX_CONCURRENT_REQUESTS = 5
-RATE_LIMIT_DELAY = 0.5  # in seconds
 
 # URLs
 SELLERS_PAGE_URL = "https://bdvtrading.com/top-sellers/"
@@ -22,3 +21,114 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
     "X-Requested-With": "XMLHttpRequest",
 }
+
+# Maximum number of card names kept in the scraper's name -> card_id cache.
+CARD_CACHE_SIZE = 100_000
+
+# Shared HTTP client (app/http_client.py)
+HTTP2_ENABLED = True  # Falls back to HTTP/1.1 when the 'h2' package is missing
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 30  # in seconds
+
+# Fetch a seller's remaining pages concurrently once the page count is known
+# from the first page; falls back to following 'Next' links otherwise.
+PAGE_FANOUT = True
+
+# Streaming listing writer: listings are upserted in batches of this size,
+# and at most LISTING_QUEUE_SIZE parsed pages wait in the queue per seller.
+LISTING_BATCH_SIZE = 1000
+LISTING_QUEUE_SIZE = 10
+
+# Conditional-fetch cache for store search pages (app/page_cache.py)
+PAGE_CACHE_PATH = "app/cache/pages/page_cache.json"
+PAGE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# HTML parser backend for store pages (app/parsing.py): "lxml" or "bs4".
+PARSER_BACKEND = "lxml"
+
+# Where store pages are parsed (app/parse_pool.py): "process", "thread" or "inline".
+PARSE_EXECUTOR = "process"
+PARSE_WORKERS = None  # Defaults to the CPU count
+
+# Sampling interval for the event-loop lag monitor, in seconds.
+LOOP_LAG_INTERVAL = 0.1
+
+# Adaptive per-host rate limiting and retries (app/rate_limiter.py)
+RATE_LIMIT_INITIAL_RPS = 5.0
+RATE_LIMIT_MIN_RPS = 0.5
+RATE_LIMIT_MAX_RPS = 50.0
+RATE_LIMIT_INCREASE = 0.5  # req/s added per second of healthy responses
+RATE_LIMIT_DECREASE_FACTOR = 0.5  # rate multiplier on 429/5xx/connection errors
+RATE_LIMIT_BURST = 5
+HTTP_MAX_RETRIES = 4
+RETRY_BACKOFF_BASE = 1.0  # in seconds
+RETRY_BACKOFF_MAX = 60.0  # in seconds
+RETRY_AFTER_MAX = 300.0  # upper bound on a server-requested Retry-After, in seconds
+
+# Sellers whose last crawl completed within this many hours are skipped.
+CRAWL_FRESHNESS_HOURS = 24
+
+# After a complete seller crawl, listings not seen in it are soft-deleted
+# ("soft", sets removed_at), deleted ("hard"), or left alone ("off").
+RECONCILE_MODE = "soft"
+# Skip a seller's full crawl when page 1 matches the last complete crawl's fingerprint.
+FINGERPRINT_PROBE = False
+
+# Read-only HTTP API: page sizes and the response cache (entries, seconds).
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+API_CACHE_SIZE = 1024
+API_CACHE_TTL = 60.0
+API_VERSION_CHECK_INTERVAL = 2.0  # seconds between data_version polls
+
+# Card names that miss an exact match fall back to a normalised-name index,
+# then (if enabled) to a pg_trgm similarity match accepted above this score.
+NAME_MATCH_FUZZY = True
+NAME_MATCH_MIN_SIMILARITY = 0.6
+
+# Sellers written per INSERT ... ON CONFLICT batch by find_sellers.
+SELLER_BATCH_SIZE = 1000
+
+# Raw page archive: "segments" (every page), "sample" (ARCHIVE_SAMPLE_RATE of
+# pages) or "off". Segments are JSONL, compressed with "zstd" (if installed),
+# "gzip" or "none", and rotated every ARCHIVE_SEGMENT_BYTES of raw JSON.
+ARCHIVE_MODE = "segments"
+ARCHIVE_DIR = "app/cache/archive"
+ARCHIVE_COMPRESSION = "zstd"
+ARCHIVE_SEGMENT_BYTES = 64 * 1024 * 1024
+ARCHIVE_SAMPLE_RATE = 0.01
+ARCHIVE_QUEUE_SIZE = 10_000  # pages buffered for the background writer
+
+# Run metrics, written at the end of each script run: "prometheus" (a .prom
+# textfile), "json" or "off".
+METRICS_FORMAT = "prometheus"
+METRICS_DIR = "app/cache/metrics"
+# Profile one seller's crawl (run on its own first) with "cprofile" or
+# "pyinstrument"; None disables profiling.
+PROFILE_SELLER = None
+PROFILER = "cprofile"
+
+# Distributed crawl: how long a worker's lease on a seller lasts without a
+# heartbeat, how often idle workers poll, and how often a job is retried.
+CRAWL_JOB_LEASE_SECONDS = 300
+CRAWL_JOB_POLL_INTERVAL = 5.0
+CRAWL_JOB_MAX_ATTEMPTS = 3
+
+# Async database pool (app/db.py); each can be overridden by the matching
+# DB_* environment variable. Timeouts and recycle ages are in seconds.
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 1800
+DB_POOL_PRE_PING = True
+# Prepared statements cached per connection (asyncpg and SQLAlchemy's adapter).
+DB_STATEMENT_CACHE_SIZE = 500
+# statement_timeout per workload, in milliseconds (0 disables it).
+DB_STATEMENT_TIMEOUTS = {
+    "default": 0,
+    "scrape": 60_000,
+    "jobs": 10_000,
+    "bulk_load": 0,
+    "api": 5_000,
+}
@@ -0,0 +1,129 @@
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from app.archive import iter_archive
+from app.parsing import get_backend
+from config import ARCHIVE_DIR, PARSER_BACKEND
+from scripts.mock_store import render_store_page
+
+SYNTHETIC_SELLER = "bench-seller-0"
+SYNTHETIC_CARD_NAMES = [f"Synthetic Card {i}" for i in range(5_000)]
+
+
+def unshared(value):
+    """A fresh copy of a string, as each parse produced before interning."""
+    return value.encode("utf-8").decode("utf-8") if isinstance(value, str) else value
+
+
+def legacy_listing(record):
+    """The dict parse_listing_html used to build for each listing."""
+    return {
+        "bdv_listing_id": record.bdv_listing_id,
+        "card_name": record.card_name,
+        "detail_url": f"/card/{record.bdv_listing_id}/",
+        "price": record.price,
+        "quantity": record.quantity,
+        "condition": unshared(record.condition),
+        "language": unshared(record.language),
+        "foil": record.foil,
+    }
+
+
+def synthetic_pages(page_count, listings_per_page):
+    return [
+        render_store_page(
+            SYNTHETIC_SELLER, page, page_count, listings_per_page, SYNTHETIC_CARD_NAMES
+        )
+        for page in range(1, page_count + 1)
+    ]
+
+
+def archived_pages(path, seller):
+    """Pages of `seller` from the archive, or of its largest store if None."""
+    records = list(iter_archive(path))
+    if not records:
+        return None, []
+    if seller is None:
+        seller = Counter(record["seller"] for record in records).most_common(1)[0][0]
+    return seller, [record for record in records if record["seller"] == seller]
+
+
+def measure(backend, pages, variant):
+    """
+    Parse every page and keep its listings, as the writer queue and batch
+    do, then return (listings, retained bytes, peak bytes, seconds).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = []
+    for page in pages:
+        records = backend.parse_listing_html(page.get("html", ""))
+        if variant == "dict":
+            records = [legacy_listing(record) for record in records]
+        kept.extend(records)
+    elapsed = time.perf_counter() - start
+    gc.collect()  # bs4 trees are reference cycles; don't count them as retained.
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(kept), retained, peak, elapsed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare per-listing memory of ListingRecords and the old listing dicts."
+    )
+    parser.add_argument(
+        "--archive",
+        default=None,
+        help=f"Use a store from an archive (e.g. {ARCHIVE_DIR}) instead of synthetic pages.",
+    )
+    parser.add_argument(
+        "--seller", default=None, help="Archived seller to use (default: the largest)."
+    )
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic store pages.")
+    parser.add_argument(
+        "--listings-per-page",
+        type=int,
+        default=100,
+        help="Listings per synthetic page.",
+    )
+    parser.add_argument("--backend", default=PARSER_BACKEND)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.archive:
+        seller, pages = archived_pages(args.archive, args.seller)
+    else:
+        seller, pages = SYNTHETIC_SELLER, synthetic_pages(
+            args.pages, args.listings_per_page
+        )
+    if not pages:
+        print("No store pages to measure.")
+        return 1
+
+    backend = get_backend(args.backend)
+    print(f"Store {seller}: {len(pages)} pages, parsed with {backend.name}.")
+    results = {}
+    for variant in ("dict", "record"):
+        listings, retained, peak, elapsed = measure(backend, pages, variant)
+        if not listings:
+            print("No listings parsed.")
+            return 1
+        results[variant] = retained / listings
+        print(
+            f"{variant:>6}: {listings} listings, {retained / listings:.0f} B/listing retained, "
+            f"peak {peak / 1024 / 1024:.1f} MiB, {elapsed / listings * 1e6:.1f} us/listing"
+        )
+    saved = 1 - results["record"] / results["dict"]
+    print(f"ListingRecord retains {saved:.0%} less memory per listing than the dicts.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from itertools import islice
+from app.archive import iter_archive
+from app.parsing import BACKENDS, Bs4Backend, get_backend
+from config import ARCHIVE_DIR
+
+CORPUS_DIR = ARCHIVE_DIR  # Raw store page archive written by scrape_stores
+
+
+def load_corpus(corpus_dir, limit):
+    """
+    Load (name, html, pagination_html) for saved store pages: archive
+    segments under `corpus_dir`, or legacy one-response-per-file *.json.
+    """
+    pages = []
+    for record in islice(iter_archive(corpus_dir), limit):
+        pages.append(
+            (
+                f"{record['seller']} page {record['page']}",
+                record.get("html", ""),
+                record.get("pagination_html", ""),
+            )
+        )
+    if pages:
+        return pages
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.json")))[:limit]:
+        with open(path, "r", encoding="utf-8") as f:
+            response = json.load(f)
+        pages.append(
+            (
+                os.path.basename(path),
+                response.get("html", ""),
+                response.get("pagination_html", ""),
+            )
+        )
+    return pages
+
+
+def parse_page(backend, html, pagination_html):
+    return backend.parse_listing_html(html), backend.parse_pagination(pagination_html)
+
+
+def check_parity(reference, candidate, pages):
+    """Return the names of pages where `candidate` disagrees with `reference`."""
+    mismatches = []
+    for name, html, pagination_html in pages:
+        expected = parse_page(reference, html, pagination_html)
+        actual = parse_page(candidate, html, pagination_html)
+        if expected != actual:
+            mismatches.append(name)
+    return mismatches
+
+
+def time_backend(backend, pages, repeat):
+    """Return the best-of-`repeat` seconds to parse the whole corpus."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, html, pagination_html in pages:
+            parse_page(backend, html, pagination_html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check parser backend parity and benchmark them over saved store pages."
+    )
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--limit", type=int, default=None, help="Use at most N pages.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.limit)
+    if not pages:
+        print(f"No saved pages found in {args.corpus}.")
+        return 1
+    listings = sum(len(Bs4Backend().parse_listing_html(html)) for _, html, _ in pages)
+    print(f"Corpus: {len(pages)} pages, {listings} listings.")
+
+    reference = Bs4Backend()
+    failed = False
+    timings = {}
+    for name in BACKENDS:
+        backend = get_backend(name)
+        if backend.name != name:
+            print(f"{name}: unavailable, skipped.")
+            continue
+        if backend.name != reference.name:
+            mismatches = check_parity(reference, backend, pages)
+            if mismatches:
+                failed = True
+                print(f"{name}: output differs from bs4 on {len(mismatches)} pages:")
+                for page_name in mismatches[:10]:
+                    print(f"    {page_name}")
+            else:
+                print(f"{name}: output identical to bs4 on all pages.")
+        timings[name] = time_backend(backend, pages, args.repeat)
+
+    baseline = timings.get(reference.name)
+    for name, seconds in timings.items():
+        per_page_ms = seconds / len(pages) * 1000
+        speedup = baseline / seconds if baseline and seconds else 0.0
+        print(
+            f"{name:>5}: {seconds:.3f}s total, {per_page_ms:.3f} ms/page, "
+            f"{len(pages) / seconds:.0f} pages/s, {speedup:.1f}x vs bs4"
+        )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
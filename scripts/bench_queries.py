@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+from app.db import get_session
+from sqlalchemy import text
+
+# Indexes added by the 9f3c6a1d8e27 migration; dropped (and rolled back) for --compare.
+SEARCH_INDEXES = [
+    "ix_cards_name",
+    "ix_cards_name_trgm",
+    "ix_listings_card_id_price",
+    "ix_listings_seller_id_last_seen",
+    "ix_listings_in_stock_card_id_price",
+    "ix_listings_in_stock_seller_id_card_id",
+]
+
+QUERIES = {
+    "card by exact name": "SELECT id FROM cards WHERE name = :card_name",
+    "card by fuzzy name": (
+        "SELECT id, name FROM cards WHERE name % :fuzzy_name "
+        "ORDER BY similarity(name, :fuzzy_name) DESC LIMIT 10"
+    ),
+    "cheapest offers for card": (
+        "SELECT id, seller_id, price FROM listings "
+        "WHERE card_id = :card_id ORDER BY price LIMIT 20"
+    ),
+    "in-stock offers for card": (
+        "SELECT id, seller_id, price FROM listings "
+        "WHERE card_id = :card_id AND quantity > 0 ORDER BY price LIMIT 20"
+    ),
+    "cheapest offer per variant (summary)": (
+        "SELECT condition, foil, language, min_price, min_seller_id "
+        "FROM card_offer_summary WHERE card_id = :card_id ORDER BY min_price LIMIT 20"
+    ),
+    "seller's recently seen listings": (
+        "SELECT id, card_id, price FROM listings "
+        "WHERE seller_id = :seller_id ORDER BY last_seen DESC LIMIT 50"
+    ),
+    "seller's in-stock inventory": (
+        "SELECT card_id FROM listings WHERE seller_id = :seller_id AND quantity > 0"
+    ),
+}
+
+
+async def pick_params(session):
+    """Pick a busy card and seller so the plans reflect realistic selectivity."""
+    result = await session.execute(
+        text(
+            "SELECT l.card_id, c.name FROM listings l JOIN cards c ON c.id = l.card_id "
+            "GROUP BY l.card_id, c.name ORDER BY count(*) DESC LIMIT 1"
+        )
+    )
+    card_row = result.first()
+    result = await session.execute(
+        text(
+            "SELECT seller_id FROM listings GROUP BY seller_id "
+            "ORDER BY count(*) DESC LIMIT 1"
+        )
+    )
+    seller_row = result.first()
+    if not card_row or not seller_row:
+        return None
+    card_id, card_name = card_row
+    return {
+        "card_id": card_id,
+        "card_name": card_name,
+        # Drop the last character to exercise the trigram match.
+        "fuzzy_name": card_name[:-1],
+        "seller_id": seller_row[0],
+    }
+
+
+async def explain_all(session, params, analyze):
+    options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+    for label, sql in QUERIES.items():
+        result = await session.execute(text(f"EXPLAIN ({options}) {sql}"), params)
+        print(f"--- {label}")
+        for (line,) in result:
+            print(f"    {line}")
+
+
+async def main(compare, analyze):
+    async with get_session() as session:
+        params = await pick_params(session)
+        if params is None:
+            print("No listings in the database; nothing to benchmark.")
+            return
+        print(f"Parameters: {params}")
+
+        if compare:
+            # DROP INDEX is transactional: drop, explain, then roll back.
+            # This takes an ACCESS EXCLUSIVE lock, so don't run it during a scrape.
+            print("\n===== BEFORE (search indexes dropped) =====")
+            for index in SEARCH_INDEXES:
+                await session.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            await explain_all(session, params, analyze)
+            await session.rollback()
+
+        print("\n===== AFTER (current schema) =====")
+        await explain_all(session, params, analyze)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Show query plans for the listing search hot paths."
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Also show the plans without the search indexes (dropped in a rolled-back transaction).",
+    )
+    parser.add_argument(
+        "--no-analyze",
+        action="store_true",
+        help="Only estimate plans (EXPLAIN) instead of running them (EXPLAIN ANALYZE).",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(main(args.compare, not args.no_analyze))
@@ -0,0 +1,369 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import text
+
+import scripts.scrape_stores as scrape_stores
+from app.archive import open_archive
+from app.db import get_session
+from app.http_client import get_client
+from app.offers import refresh_offer_summary
+from app.page_cache import PageCache
+from scripts.mock_store import (
+    BENCH_LISTING_ID_BASE,
+    BENCH_LISTING_ID_MAX,
+    bench_listing_id,
+    render_store_page,
+)
+
+BENCH_SELLER_PREFIX = "bench-seller-"
+BENCH_METRICS_JOB = "bench_scrape"
+
+
+class MockStoreServer:
+    """
+    Local stand-in for bdvtrading.com store search pages.
+
+    Serves `/store/<seller>/search/json/?page=N` with the same
+    {html, pagination_html} JSON that fetch_store_page consumes, built
+    deterministically from the seller and page so repeated runs see the
+    same pages. Responses are delayed by `latency` (+/- `jitter`) seconds,
+    and a fraction `error_rate` of them are 503s.
+    """
+
+    def __init__(
+        self, page_count, listings_per_page, card_names, latency, jitter, error_rate
+    ):
+        self.page_count = page_count
+        self.listings_per_page = listings_per_page
+        self.card_names = card_names or ["Unknown Card"]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.listings_served = 0
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def render_page(self, seller_name, page):
+        payload = render_store_page(
+            seller_name, page, self.page_count, self.listings_per_page, self.card_names
+        )
+        self.listings_served += self.listings_per_page
+        return payload
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                # Skip the request headers.
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                _, target, _ = request_line.decode("latin-1").split(" ", 2)
+                status, body = await self._respond(target)
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode(
+                        "latin-1"
+                    )
+                    + body
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, target):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        url = urlsplit(target)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 4 or parts[0] != "store" or parts[2:] != ["search", "json"]:
+            return "404 Not Found", b"{}"
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return "503 Service Unavailable", b"{}"
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        if page > self.page_count:
+            payload = {"html": "", "pagination_html": ""}
+        else:
+            payload = self.render_page(parts[1], page)
+        return "200 OK", json.dumps(payload).encode("utf-8")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def setup_sellers(base_url, count):
+    """
+    Create (or re-point) the bench sellers and clear their previous runs.
+    Refuses to run if a real listing has an id in the bench id range.
+    """
+    names = [f"{BENCH_SELLER_PREFIX}{i}" for i in range(count)]
+    async with get_session("scrape") as session:
+        result = await session.execute(
+            text(
+                "SELECT count(*) FROM listings l JOIN sellers s ON s.id = l.seller_id "
+                "WHERE l.bdv_listing_id >= :base AND s.name NOT LIKE :prefix"
+            ),
+            {"base": BENCH_LISTING_ID_BASE, "prefix": BENCH_SELLER_PREFIX + "%"},
+        )
+        if result.scalar():
+            raise RuntimeError(
+                f"Real listings have ids >= {BENCH_LISTING_ID_BASE}; the bench "
+                "would overwrite them. Use a dedicated bench database."
+            )
+        await session.execute(
+            text(
+                "INSERT INTO sellers (name, store_url) VALUES (:name, :store_url) "
+                "ON CONFLICT (name) DO UPDATE SET store_url = EXCLUDED.store_url"
+            ),
+            [{"name": name, "store_url": f"{base_url}/store/{name}"} for name in names],
+        )
+        await session.execute(
+            text(
+                "DELETE FROM crawl_state WHERE seller_id IN "
+                "(SELECT id FROM sellers WHERE name = ANY(:names))"
+            ),
+            {"names": names},
+        )
+        await session.commit()
+        result = await session.execute(
+            text("SELECT name FROM cards ORDER BY random() LIMIT 2000")
+        )
+        card_names = result.scalars().all()
+    return names, card_names
+
+
+async def cleanup_sellers(names):
+    """Delete the bench sellers and everything derived from their listings."""
+    async with get_session("scrape") as session:
+        result = await session.execute(
+            text(
+                "SELECT DISTINCT l.card_id FROM listings l JOIN sellers s "
+                "ON s.id = l.seller_id WHERE s.name = ANY(:names)"
+            ),
+            {"names": names},
+        )
+        card_ids = result.scalars().all()
+        await session.execute(
+            text(
+                "DELETE FROM listing_price_history WHERE seller_id IN "
+                "(SELECT id FROM sellers WHERE name = ANY(:names))"
+            ),
+            {"names": names},
+        )
+        await session.execute(
+            text("DELETE FROM sellers WHERE name = ANY(:names)"), {"names": names}
+        )
+        await refresh_offer_summary(session, card_ids)
+        await session.commit()
+
+
+def instrument(latencies, db_times):
+    """Time every page fetch and every listings upsert made by scrape_stores."""
+    fetch_store_page = scrape_stores.fetch_store_page
+    upsert_listings = scrape_stores.upsert_listings
+
+    async def timed_fetch(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fetch_store_page(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    async def timed_upsert(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await upsert_listings(*args, **kwargs)
+        finally:
+            db_times.append(time.perf_counter() - start)
+
+    scrape_stores.fetch_store_page = timed_fetch
+    scrape_stores.upsert_listings = timed_upsert
+
+
+def peak_rss_mib():
+    """Peak RSS of this process and of its (parse worker) children, in MiB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+async def run(args):
+    server = MockStoreServer(
+        args.pages,
+        args.listings_per_page,
+        None,
+        args.latency_ms / 1000,
+        args.jitter_ms / 1000,
+        args.error_rate,
+    )
+    last_id = bench_listing_id(
+        args.sellers - 1, args.pages, args.pages, args.listings_per_page - 1
+    )
+    if last_id > BENCH_LISTING_ID_MAX:
+        raise SystemExit("Too many sellers x pages for the bench listing id range.")
+    base_url = await server.start()
+    names, server.card_names = await setup_sellers(base_url, args.sellers)
+    if not server.card_names:
+        print("No cards in the database; listings will be dropped as unresolved.")
+        server.card_names = ["Unknown Card"]
+    print(
+        f"Mock store server on {base_url}: {args.sellers} sellers x {args.pages} pages."
+    )
+
+    # Start the bench host at the requested rate instead of the polite default.
+    limiter = get_client().rate_limiters.for_url(base_url)
+    limiter.rate = limiter.max_rate = args.rps
+    limiter.capacity = limiter.tokens = max(args.rps / 10, 1)
+
+    latencies = []
+    db_times = []
+    instrument(latencies, db_times)
+    # Keep bench pages out of the real archive and page cache.
+    work_dir = tempfile.mkdtemp(prefix="bench-scrape-")
+    open_archive(mode=args.archive, directory=os.path.join(work_dir, "archive"))
+    page_cache = PageCache(path=os.path.join(work_dir, "page_cache.json"))
+
+    start = time.perf_counter()
+    try:
+        await scrape_stores.main(
+            seller_names=names, page_cache=page_cache, metrics_job=BENCH_METRICS_JOB
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        await server.stop()
+        if not args.keep:
+            await cleanup_sellers(names)
+
+    own_rss, children_rss = peak_rss_mib()
+    pages = len(latencies)
+    return {
+        "sellers": args.sellers,
+        "pages": pages,
+        "listings": server.listings_served,
+        "server_errors": server.errors,
+        "elapsed_s": elapsed,
+        "pages_per_s": pages / elapsed if elapsed else 0.0,
+        "listings_per_s": server.listings_served / elapsed if elapsed else 0.0,
+        "page_latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "page_latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "db_time_s": sum(db_times),
+        "upserts": len(db_times),
+        "peak_rss_mib": own_rss,
+        "peak_rss_children_mib": children_rss,
+    }
+
+
+def report(results):
+    print(
+        f"Scrape benchmark: {results['pages']} pages, {results['listings']} listings "
+        f"in {results['elapsed_s']:.2f}s\n"
+        f"    {results['pages_per_s']:.1f} pages/s, {results['listings_per_s']:.0f} listings/s\n"
+        f"    page latency p50 {results['page_latency_p50_ms']:.1f} ms, "
+        f"p99 {results['page_latency_p99_ms']:.1f} ms\n"
+        f"    DB time {results['db_time_s']:.2f}s over {results['upserts']} upserts\n"
+        f"    peak RSS {results['peak_rss_mib']:.0f} MiB "
+        f"(+{results['peak_rss_children_mib']:.0f} MiB in parse workers), "
+        f"{results['server_errors']} injected errors"
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Return the metrics that regressed by more than `tolerance` vs baseline."""
+    regressions = []
+    for metric, higher_is_better in (
+        ("pages_per_s", True),
+        ("listings_per_s", True),
+        ("page_latency_p99_ms", False),
+        ("db_time_s", False),
+        ("peak_rss_mib", False),
+    ):
+        old, new = baseline.get(metric), results[metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(
+                f"{metric}: {old:.2f} -> {new:.2f} ({change * 100:+.1f}%)"
+            )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark scrape_stores end to end against a local mock store server."
+    )
+    parser.add_argument("--sellers", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per seller.")
+    parser.add_argument("--listings-per-page", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--rps", type=float, default=1000.0, help="Rate limit for the mock host."
+    )
+    parser.add_argument(
+        "--archive", choices=["off", "segments", "sample"], default="off"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the bench sellers and listings."
+    )
+    parser.add_argument("--save", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against results saved with --save.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Allowed relative regression vs --baseline before failing.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = asyncio.run(run(args))
+    report(results)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import sys
+
+from app.parsing import Bs4Backend, ListingRecord, LxmlBackend, get_backend
+from scripts.bench_parsers import parse_page
+from scripts.mock_store import render_store_page
+
+# Fixed pages on which the lxml backend must produce exactly what the bs4
+# reference does. Runs without a database or a saved corpus:
+#   PYTHONPATH=. python scripts/check_parser_parity.py
+
+MOCK_CARD_NAMES = ["Lim-Dûl's Vault", "Fire // Ice", "Ætherling", "R&D's Secret Lair"]
+
+MISSING_FIELDS_HTML = """
+<div class="col product-card shadow">
+  <a class="card-link" href="/card/101/">No Price</a>
+  <span id="product-quantity-101">3</span>
+  <div class="condition">LP</div>
+  <div class="language"><i class="flag-icon flag-icon-jp"></i></div>
+</div>
+<div class="col product-card shadow">
+  <a class="card-link" href="/card/102/">No Quantity</a>
+  <div class="price">$1.25</div>
+  <div class="condition">NM</div>
+  <div class="language"><i class="flag-icon flag-icon-de"></i></div>
+</div>
+<div class="col product-card shadow">
+  <a class="card-link" href="/card/103/">No Flag</a>
+  <div class="price">$0.10</div>
+  <span id="product-quantity-103">1</span>
+  <div class="language"><i class="icon"></i></div>
+</div>
+<div class="col product-card shadow">
+  <div class="price">$9.99</div>
+  <span id="product-quantity-104">2</span>
+</div>
+"""
+
+NESTED_CARD_LINK_HTML = """
+<div class="col product-card shadow">
+  <a class="card-link" href="/card/201/">
+    Lim-D&ucirc;l&#39;s <b>Vault</b> &amp; <span class="set"> Alliances </span>
+  </a>
+  <div class="price"> <span>$</span>12.50 </div>
+  <span id="product-quantity-201"> 4 </span>
+  <div class="condition"> MP </div>
+  <div class="language"><i class="flag-icon flag-icon-fr extra"></i></div>
+</div>
+"""
+
+NESTED_NEXT_PAGINATION_HTML = """
+<ul class="pagination">
+  <li><a class="page-link" href="?page=1" data-page="1">1</a></li>
+  <li class="active"><span>2</span></li>
+  <li><a class="page-link" href="?page=3" data-page="3">3</a></li>
+  <li><a class="page-link" href="?page=3"><span> Next </span></a></li>
+</ul>
+"""
+
+WINDOWED_PAGINATION_HTML = """
+<ul class="pagination">
+  <li class="active"><span>1</span></li>
+  <li><a class="page-link" href="?page=2&amp;sort=price">2</a></li>
+  <li><a class="page-link" href="?page=3&amp;sort=price">3</a></li>
+  <li><a class="page-link" href="?page=4&amp;sort=price">4</a></li>
+  <li><a class="page-link" href="?page=5&amp;sort=price">5</a></li>
+  <li class="disabled"><span>&hellip;</span></li>
+  <li><a class="page-link" href="?page=2&amp;sort=price">Next</a></li>
+</ul>
+"""
+
+
+def mock_store_fixture():
+    page = render_store_page("bench-seller-7", 2, 3, 25, MOCK_CARD_NAMES)
+    return page["html"], page["pagination_html"]
+
+
+# (name, html, pagination_html, expected bs4 output). The expected output
+# keeps the fixtures honest: two backends that both parse nothing agree.
+FIXTURES = [
+    ("mock store page", *mock_store_fixture(), None),
+    (
+        "missing price, quantity and flag",
+        MISSING_FIELDS_HTML,
+        "",
+        (
+            [
+                ListingRecord(101, "No Price", None, 3, "LP", "jp"),
+                ListingRecord(None, "No Quantity", 1.25, 0, "NM", "de"),
+                ListingRecord(103, "No Flag", 0.1, 1, "N/A", "unknown"),
+                ListingRecord(104, None, 9.99, 2, "N/A", "unknown"),
+            ],
+            (False, None),
+        ),
+    ),
+    (
+        "entities and nested tags in the card link",
+        NESTED_CARD_LINK_HTML,
+        NESTED_NEXT_PAGINATION_HTML,
+        (
+            [ListingRecord(201, "Lim-Dûl'sVault&Alliances", 12.5, 4, "MP", "fr")],
+            (True, 3),
+        ),
+    ),
+    ("windowed pagination", "", WINDOWED_PAGINATION_HTML, ([], (True, 5))),
+]
+
+
+def check_fixtures(reference, candidate):
+    """
+    Assert that `candidate` parses every fixture exactly as `reference`
+    does, and that `reference` gives each fixture's expected output.
+    """
+    for name, html, pagination_html, expected in FIXTURES:
+        reference_output = parse_page(reference, html, pagination_html)
+        if expected is not None:
+            assert reference_output == expected, (
+                f"{name}: {reference.name} gave {reference_output!r}, "
+                f"expected {expected!r}"
+            )
+        candidate_output = parse_page(candidate, html, pagination_html)
+        assert candidate_output == reference_output, (
+            f"{name}: {candidate.name} gave {candidate_output!r}, "
+            f"{reference.name} gave {reference_output!r}"
+        )
+        records, pagination = reference_output
+        print(f"{name}: {len(records)} listings, {pagination} - identical.")
+
+
+def main():
+    candidate = get_backend(LxmlBackend.name)
+    if candidate.name != LxmlBackend.name:
+        print("lxml backend unavailable; nothing to compare.")
+        return 0
+    try:
+        check_fixtures(Bs4Backend(), candidate)
+    except AssertionError as e:
+        print(f"Parser parity check failed: {e}")
+        return 1
+    print(f"lxml matches bs4 on all {len(FIXTURES)} fixtures.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
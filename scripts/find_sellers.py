@@ -1,110 +1,168 @@
 import asyncio
 import httpx
 from bs4 import BeautifulSoup
-from app.db import AsyncSessionLocal
-from app.models import Seller
-from sqlalchemy import select
+from app.db import get_session
+from app.http_client import get_client, close_client
+from app.metrics import ROWS_BUCKETS, metrics
+from app.parsing import page_count_from_links
+from sqlalchemy import text
 from tqdm import tqdm
 
 from config import (
     SELLERS_PAGE_URL,
-    TIMEOUT,
-    RATE_LIMIT_DELAY
+    MAX_CONCURRENT_REQUESTS,
+    SELLER_BATCH_SIZE,
 )
 
-SESSION = httpx.AsyncClient()
+UPSERT_SELLERS_SQL = """
+INSERT INTO sellers (name, store_url)
+VALUES (:name, :store_url)
+ON CONFLICT (name) DO UPDATE
+SET store_url = EXCLUDED.store_url
+WHERE sellers.store_url IS DISTINCT FROM EXCLUDED.store_url;
+"""
 
 
-async def fetch_sellers():
-    """Fetch the seller page, extract sellers' names and URLs, and handle pagination."""
-    sellers = []
-    page_number = 1
-    has_more_pages = True
+def log_error(message):
+    print(message)
+    metrics.inc("find_sellers_errors_total")
+    with open("error_log.txt", "a") as f:
+        f.write(f"{message}\n")
 
-    while has_more_pages:
-        try:
-            print(f"Fetching sellers from page {page_number}...")
-            response = await SESSION.get(
-                f"{SELLERS_PAGE_URL}?page={page_number}", timeout=TIMEOUT
-            )
-            response.raise_for_status()  # Raise an error for bad responses
 
-            soup = BeautifulSoup(response.text, "html.parser")
+def parse_sellers_page(html):
+    """Return (sellers, has_next, page_count) from a top-sellers page."""
+    soup = BeautifulSoup(html, "html.parser")
 
-            # Extract seller names from <div class="seller-content">
-            seller_elements = soup.find_all("div", class_="seller-content")
-            print(
-                f"Found {len(seller_elements)} seller elements on page {page_number}."
-            )
-            for seller in seller_elements:
-                seller_name_tag = seller.find("h5")
-                if seller_name_tag:
-                    seller_name = seller_name_tag.get_text(strip=True)
-                    # Construct store URL based on seller name (spaces replaced by hyphens)
-                    store_url = (
-                        f"https://bdvtrading.com/store/{seller_name.replace(' ', '-')}"
-                    )
-                    sellers.append({"name": seller_name, "store_url": store_url})
-                else:
-                    print(f"Error: Missing name for seller: {seller}. Skipping.")
-
-            print(
-                f"Total sellers collected so far: {len(sellers)} on page {page_number}."
+    # Extract seller names from <div class="seller-content">
+    sellers = []
+    for seller in soup.find_all("div", class_="seller-content"):
+        seller_name_tag = seller.find("h5")
+        if seller_name_tag:
+            seller_name = seller_name_tag.get_text(strip=True)
+            # Construct store URL based on seller name (spaces replaced by hyphens)
+            store_url = f"https://bdvtrading.com/store/{seller_name.replace(' ', '-')}"
+            sellers.append({"name": seller_name, "store_url": store_url})
+        else:
+            print(f"Error: Missing name for seller: {seller}. Skipping.")
+
+    # Check if there's another page using the pagination block
+    pagination = soup.find("ul", class_="pagination")
+    has_next = False
+    page_count = None
+    if pagination:
+        links = pagination.find_all("a")
+        has_next = any(
+            link.string and link.string.strip().lower() == "next" for link in links
+        )
+        page_count = page_count_from_links(
+            (
+                link.get_text(strip=True),
+                str(link.get("data-page", "")),
+                str(link.get("href", "")),
             )
+            for link in links
+        )
+    return sellers, has_next, page_count
+
+
+async def fetch_sellers_page(page_number):
+    """Fetch and parse one top-sellers page; returns None on error."""
+    try:
+        print(f"Fetching sellers from page {page_number}...")
+        with metrics.timer("find_sellers_fetch_seconds"):
+            response = await get_client().get(f"{SELLERS_PAGE_URL}?page={page_number}")
+        metrics.inc("find_sellers_responses_total", status=str(response.status_code))
+        response.raise_for_status()  # Raise an error for bad responses
+        with metrics.timer("find_sellers_parse_seconds"):
+            sellers, has_next, page_count = parse_sellers_page(response.text)
+        metrics.observe("find_sellers_page_sellers", len(sellers), buckets=ROWS_BUCKETS)
+        print(f"Found {len(sellers)} sellers on page {page_number}.")
+        return sellers, has_next, page_count
+    except httpx.HTTPError as e:
+        log_error(f"Error fetching seller list page {page_number}: {e}")
+    except Exception as e:
+        log_error(f"Unexpected error on seller list page {page_number}: {e}")
+    return None
 
-            # Check if there's another page using the pagination block
-            pagination = soup.find("ul", class_="pagination")
-            next_page_button = (
-                pagination.find("a", string=lambda t: t and t.strip().lower() == "next")
-                if pagination
-                else None
-            )
-            if next_page_button:
-                page_number += 1  # Next page exists, move to the next one
-            else:
-                has_more_pages = False  # No next page, stop the loop
-
-            await asyncio.sleep(RATE_LIMIT_DELAY)  # Asynchronous rate limiting
-
-        except httpx.RequestError as e:
-            print(f"Error fetching seller list: {e}")
-            with open("error_log.txt", "a") as f:
-                f.write(f"Error fetching seller list: {e}\n")
-            has_more_pages = False
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            with open("error_log.txt", "a") as f:
-                f.write(f"Unexpected error: {e}\n")
-            has_more_pages = False
+
+async def fetch_sellers():
+    """
+    Fetch the seller directory and upsert it into the database.
+
+    Page 1 gives the page count, after which the remaining pages are
+    fetched concurrently (paced by the shared client's rate limiter). Pages
+    past that count (windowed pagination), or all of them if the count
+    can't be read, are walked one by one via their "next" link.
+    """
+    first = await fetch_sellers_page(1)
+    if first is None:
+        return
+    sellers, has_next, page_count = first
+
+    page_number = 1
+    if has_next and page_count and page_count > 1:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async def fetch_page(page_number):
+            async with semaphore:
+                return await fetch_sellers_page(page_number)
+
+        # gather keeps page order, so the directory order is preserved.
+        results = await asyncio.gather(
+            *(fetch_page(page_number) for page_number in range(2, page_count + 1))
+        )
+        for result in results:
+            if result is not None:
+                sellers.extend(result[0])
+        # Windowed pagination ("1 2 3 ... Next") only links the first pages;
+        # if the last of them still has a "next" link, walk on from there.
+        page_number = page_count
+        has_next = results[-1] is not None and results[-1][1]
+        if has_next:
+            print(f"Seller directory continues past page {page_count}.")
+
+    while has_next:
+        page_number += 1
+        result = await fetch_sellers_page(page_number)
+        if result is None:
+            break
+        page_sellers, has_next, _ = result
+        sellers.extend(page_sellers)
+
+    print(f"Total sellers collected: {len(sellers)}.")
+    metrics.set("find_sellers_collected", len(sellers))
 
     # Once we have all the sellers, upsert them into the database
     await upsert_sellers_into_db(sellers)
 
 
 async def upsert_sellers_into_db(sellers):
-    """Upsert the sellers into the sellers table by checking for existing records."""
-    async with AsyncSessionLocal() as session:
-        for seller in sellers:
-            # Check if a seller with the same name already exists
-            result = await session.execute(
-                select(Seller).filter_by(name=seller["name"])
-            )
-            existing_seller = result.scalars().first()
-            if existing_seller:
-                # Optionally update the store_url if it has changed
-                if existing_seller.store_url != seller["store_url"]:
-                    existing_seller.store_url = seller["store_url"]
-            else:
-                # If the seller does not exist, add a new record
-                db_seller = Seller(name=seller["name"], store_url=seller["store_url"])
-                session.add(db_seller)
-        await session.commit()
-        print(f"Upserted {len(sellers)} sellers into the database.")
+    """
+    Upsert the sellers by name with batched INSERT ... ON CONFLICT, updating
+    the store_url only where it changed.
+    """
+    # The last occurrence of a name wins, as it would with per-row updates.
+    unique = list({seller["name"]: seller for seller in sellers}.values())
+    async with get_session("scrape") as session:
+        for start in tqdm(range(0, len(unique), SELLER_BATCH_SIZE), desc="Sellers"):
+            batch = unique[start : start + SELLER_BATCH_SIZE]
+            metrics.observe("find_sellers_batch_rows", len(batch), buckets=ROWS_BUCKETS)
+            with metrics.timer("find_sellers_upsert_seconds"):
+                await session.execute(text(UPSERT_SELLERS_SQL), batch)
+        with metrics.timer("find_sellers_commit_seconds"):
+            await session.commit()
+    print(f"Upserted {len(unique)} sellers into the database.")
 
 
 async def main():
     """Main function to fetch sellers."""
-    await fetch_sellers()
+    try:
+        with metrics.timer("find_sellers_run_seconds"):
+            await fetch_sellers()
+    finally:
+        await close_client()
+        metrics.write("find_sellers")
 
 
 if __name__ == "__main__":
@@ -1,118 +1,368 @@
+import argparse
+import hashlib
 import ijson
 import os
 import asyncio
 import uuid
-from app.db import AsyncSessionLocal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from app.data_version import bump_data_version
+from app.db import engine, get_session, statement_timeout
+from app.metrics import ROWS_BUCKETS, metrics
 from app.models import Card
 from sqlalchemy import text
 from tqdm import tqdm
 import json
 
 BULK_DATA_PATH = "app/cache/scryfall/all-cards.json"  # Path to the downloaded JSON
+PARSE_CHUNK_SIZE = 1000  # Raw cards handed to a mapping worker at a time
 
+CARD_COLUMNS = [
+    "scryfall_id",
+    "name",
+    "set_name",
+    "image_url",
+    "mana_cost",
+    "mana_value",
+    "types",
+    "power",
+    "toughness",
+    "content_hash",
+]
 
-async def upsert_bulk_data():
-    # Check if file exists
-    if not os.path.exists(BULK_DATA_PATH):
-        print(f"❌ File does not exist: {BULK_DATA_PATH}")
+# Mapped fields covered by content_hash; a card is only rewritten when one changes.
+HASHED_COLUMNS = CARD_COLUMNS[1:-1]
+
+UPSERT_SQL = """
+INSERT INTO cards (scryfall_id, name, set_name, image_url, mana_cost, mana_value, types, power, toughness, content_hash)
+VALUES (:scryfall_id, :name, :set_name, :image_url, :mana_cost, :mana_value, :types, :power, :toughness, :content_hash)
+ON CONFLICT (scryfall_id) DO UPDATE
+SET name = EXCLUDED.name,
+    set_name = EXCLUDED.set_name,
+    image_url = EXCLUDED.image_url,
+    mana_cost = EXCLUDED.mana_cost,
+    mana_value = EXCLUDED.mana_value,
+    types = EXCLUDED.types,
+    power = EXCLUDED.power,
+    toughness = EXCLUDED.toughness,
+    content_hash = EXCLUDED.content_hash;
+"""
+
+# Staging table for the COPY path. mana_value is staged as a float because
+# Scryfall's cmc is a float; it is cast to integer during the merge.
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE cards_staging (
+    scryfall_id uuid NOT NULL,
+    name text,
+    set_name text,
+    image_url text,
+    mana_cost text,
+    mana_value double precision,
+    types varchar[],
+    power text,
+    toughness text,
+    content_hash bigint
+) ON COMMIT DROP;
+"""
+
+MERGE_STAGING_SQL = """
+INSERT INTO cards (scryfall_id, name, set_name, image_url, mana_cost, mana_value, types, power, toughness, content_hash)
+SELECT DISTINCT ON (scryfall_id)
+    scryfall_id, name, set_name, image_url, mana_cost, mana_value::integer, types, power, toughness, content_hash
+FROM cards_staging
+ORDER BY scryfall_id
+ON CONFLICT (scryfall_id) DO UPDATE
+SET name = EXCLUDED.name,
+    set_name = EXCLUDED.set_name,
+    image_url = EXCLUDED.image_url,
+    mana_cost = EXCLUDED.mana_cost,
+    mana_value = EXCLUDED.mana_value,
+    types = EXCLUDED.types,
+    power = EXCLUDED.power,
+    toughness = EXCLUDED.toughness,
+    content_hash = EXCLUDED.content_hash;
+"""
+
+
+def fastest_ijson_backend():
+    """Return the C (yajl2_c) ijson backend when it is available."""
+    try:
+        return ijson.get_backend("yajl2_c")
+    except ImportError:
+        print(f"ijson yajl2_c backend unavailable; using '{ijson.backend}'.")
+        return ijson
+
+
+def map_card(card):
+    """Map a Scryfall card object to a row for the cards table, or None to skip it."""
+    scryfall_id_str = card.get("id")
+    if not scryfall_id_str:
+        return None
+    return {
+        "scryfall_id": uuid.UUID(scryfall_id_str),
+        "name": card.get("name"),
+        "set_name": card.get("set_name"),
+        "image_url": card.get("image_uris", {}).get("large"),
+        "mana_cost": card.get("mana_cost"),
+        "mana_value": card.get("cmc"),
+        # Split the "type_line" to get the first part before " — " then split into a list.
+        "types": (
+            card.get("type_line", "").split(" — ")[0].split()
+            if card.get("type_line")
+            else []
+        ),
+        "power": card.get("power"),
+        "toughness": card.get("toughness"),
+    }
+
+
+def card_hash(row):
+    """Return a compact signed 64-bit hash of a card row's mapped fields."""
+    # ijson yields Decimal for numbers, hence default=str.
+    payload = json.dumps(
+        [row[column] for column in HASHED_COLUMNS], ensure_ascii=False, default=str
+    )
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def map_cards(cards):
+    """
+    Map a chunk of raw Scryfall cards to row tuples in CARD_COLUMNS order,
+    content_hash included. Runs in a worker process.
+    """
+    rows = []
+    for card in cards:
+        try:
+            row = map_card(card)
+        except Exception as e:
+            print(f"Error processing card: {e}")
+            continue
+        if row is not None:
+            row["content_hash"] = card_hash(row)
+            rows.append(tuple(row[column] for column in CARD_COLUMNS))
+    return rows
+
+
+async def load_existing_hashes():
+    """Return {scryfall_id.int: content_hash} for every card already in the database."""
+    async with get_session("bulk_load") as session:
+        result = await session.execute(
+            text("SELECT scryfall_id, content_hash FROM cards")
+        )
+        return {scryfall_id.int: content_hash for scryfall_id, content_hash in result}
+
+
+def new_stats():
+    return {"total_cards": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+
+
+def filter_changed(rows, existing_hashes, stats):
+    """
+    Return only the new or changed rows of a batch, counting each outcome.
+
+    With `existing_hashes` set to None every row is kept (full import).
+    """
+    if existing_hashes is None:
+        return rows
+    hash_index = CARD_COLUMNS.index("content_hash")
+    changed = []
+    for row in rows:
+        key = row[0].int  # scryfall_id
+        if key not in existing_hashes:
+            stats["inserted"] += 1
+        elif existing_hashes[key] == row[hash_index]:
+            stats["unchanged"] += 1
+            continue
+        else:
+            stats["updated"] += 1
+        changed.append(row)
+    return changed
+
+
+def report_changes(stats, existing_hashes):
+    for outcome, count in stats.items():
+        metrics.set("load_bulk_cards", count, outcome=outcome)
+    if existing_hashes is None:
+        print("Full import: change detection was skipped.")
         return
+    print(
+        f"Inserted: {stats['inserted']}, updated: {stats['updated']}, "
+        f"unchanged (skipped): {stats['unchanged']}"
+    )
 
-    with open(BULK_DATA_PATH, "r", encoding="utf-8") as f:
-        print(f"✅ File opened: {BULK_DATA_PATH}")
-
-        async with AsyncSessionLocal() as session:
-            parser = ijson.items(f, "item")
-            total_cards = 0
-            batch_size = 500  # Number of records to insert in one batch
-            batch = []
-            failed_inserts = 0
-
-            progress_bar = tqdm(parser, desc="Processing cards", unit="card")
-            for card in progress_bar:
-                total_cards += 1
-                progress_bar.set_postfix({"Processed": total_cards})
-                try:
-                    scryfall_id_str = card.get("id")
-                    if not scryfall_id_str:
-                        continue
-                    card_values = {
-                        "scryfall_id": uuid.UUID(scryfall_id_str),
-                        "name": card.get("name"),
-                        "set_name": card.get("set_name"),
-                        "image_url": card.get("image_uris", {}).get("large"),
-                        "mana_cost": card.get("mana_cost"),
-                        "mana_value": card.get("cmc"),
-                        # Split the "type_line" to get the first part before " — " then split into a list.
-                        "types": (
-                            card.get("type_line", "").split(" — ")[0].split()
-                            if card.get("type_line")
-                            else []
-                        ),
-                        "power": card.get("power"),
-                        "toughness": card.get("toughness"),
-                    }
-                except Exception as e:
-                    print(f"Error processing card: {e}")
-                    continue
 
-                # Append the values (as a Python dict) to the batch; do not convert to JSON string.
-                batch.append(card_values)
+async def iter_row_batches(f, stats, workers):
+    """
+    Parse the bulk data file and yield batches of mapped row tuples, in file order.
+
+    JSON parsing runs in a thread with the fastest ijson backend, and the
+    card -> row mapping runs in a pool of `workers` processes, so the event
+    loop is left free for the database writer. At most two chunks per worker
+    are in flight at a time.
+    """
+    loop = asyncio.get_running_loop()
+    backend = fastest_ijson_backend()
+    cards = backend.items(f, "item")
+    progress_bar = tqdm(desc="Processing cards", unit="card")
+
+    def next_chunk():
+        return list(islice(cards, PARSE_CHUNK_SIZE))
 
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < workers * 2:
+                with metrics.timer("load_bulk_json_parse_seconds"):
+                    chunk = await loop.run_in_executor(None, next_chunk)
+                if not chunk:
+                    exhausted = True
+                    break
+                stats["total_cards"] += len(chunk)
+                progress_bar.update(len(chunk))
+                pending.append(loop.run_in_executor(pool, map_cards, chunk))
+            if not pending:
+                break
+            with metrics.timer("load_bulk_map_wait_seconds"):
+                rows = await pending.popleft()
+            yield rows
+    progress_bar.close()
+
+
+async def insert_bulk_data(f, existing_hashes, workers):
+    """Upsert cards with batched parameterised INSERT ... ON CONFLICT statements."""
+    stats = new_stats()
+    batch_size = 500  # Number of records to insert in one batch
+    failed_inserts = 0
+
+    async with get_session("bulk_load") as session:
+
+        async def flush(batch):
+            nonlocal failed_inserts
+            metrics.observe("load_bulk_batch_rows", len(batch), buckets=ROWS_BUCKETS)
+            try:
+                with metrics.timer("load_bulk_upsert_seconds"):
+                    result = await session.execute(text(UPSERT_SQL), batch)
+                    await session.commit()
+                print(
+                    f"Processed {stats['total_cards']} cards, {result.rowcount} rows affected."
+                )
+            except Exception as e:
+                print(f"Error during bulk upsert: {e}")
+                await session.rollback()  # Roll back on error
+                failed_inserts += 1
+                metrics.inc("load_bulk_failed_batches_total")
+
+        batch = []
+        async for rows in iter_row_batches(f, stats, workers):
+            for row in filter_changed(rows, existing_hashes, stats):
+                # Append the values (as a Python dict) to the batch; do not convert to JSON string.
+                batch.append(dict(zip(CARD_COLUMNS, row)))
                 if len(batch) >= batch_size:
-                    sql = """
-                    INSERT INTO cards (scryfall_id, name, set_name, image_url, mana_cost, mana_value, types, power, toughness)
-                    VALUES (:scryfall_id, :name, :set_name, :image_url, :mana_cost, :mana_value, :types, :power, :toughness)
-                    ON CONFLICT (scryfall_id) DO UPDATE
-                    SET name = EXCLUDED.name,
-                        set_name = EXCLUDED.set_name,
-                        image_url = EXCLUDED.image_url,
-                        mana_cost = EXCLUDED.mana_cost,
-                        mana_value = EXCLUDED.mana_value,
-                        types = EXCLUDED.types,
-                        power = EXCLUDED.power,
-                        toughness = EXCLUDED.toughness;
-                    """
-                    try:
-                        result = await session.execute(text(sql), batch)
-                        await session.commit()
-                        print(
-                            f"Processed {total_cards} cards, {result.rowcount} rows affected."
-                        )
-                    except Exception as e:
-                        print(f"Error during bulk upsert: {e}")
-                        await session.rollback()  # Roll back on error
-                        failed_inserts += 1
+                    await flush(batch)
                     batch = []  # Reset the batch after insertion
 
-            if batch:
-                sql = """
-                INSERT INTO cards (scryfall_id, name, set_name, image_url, mana_cost, mana_value, types, power, toughness)
-                VALUES (:scryfall_id, :name, :set_name, :image_url, :mana_cost, :mana_value, :types, :power, :toughness)
-                ON CONFLICT (scryfall_id) DO UPDATE
-                SET name = EXCLUDED.name,
-                    set_name = EXCLUDED.set_name,
-                    image_url = EXCLUDED.image_url,
-                    mana_cost = EXCLUDED.mana_cost,
-                    mana_value = EXCLUDED.mana_value,
-                    types = EXCLUDED.types,
-                    power = EXCLUDED.power,
-                    toughness = EXCLUDED.toughness;
-                """
-                try:
-                    result = await session.execute(text(sql), batch)
-                    await session.commit()
-                    print(
-                        f"Processed {total_cards} cards, {result.rowcount} rows affected."
-                    )
-                except Exception as e:
-                    print(f"Error during bulk upsert: {e}")
-                    await session.rollback()
-                    failed_inserts += 1
-
-            print(
-                f"✅ Bulk upsert of {total_cards} cards completed. Failed inserts: {failed_inserts}"
+        if batch:
+            await flush(batch)
+
+    print(
+        f"✅ Bulk upsert of {stats['total_cards']} cards completed. Failed inserts: {failed_inserts}"
+    )
+    report_changes(stats, existing_hashes)
+
+
+async def copy_bulk_data(f, existing_hashes, workers):
+    """
+    Stream all cards into a temporary staging table with asyncpg's binary
+    COPY, then merge them into cards with one INSERT ... SELECT ... ON CONFLICT.
+
+    Everything runs in a single transaction, so a failure leaves cards untouched.
+    """
+    stats = new_stats()
+
+    async def records():
+        async for rows in iter_row_batches(f, stats, workers):
+            for row in filter_changed(rows, existing_hashes, stats):
+                yield row
+
+    async with engine.connect() as conn:
+        raw_conn = await conn.get_raw_connection()
+        pg_conn = raw_conn.driver_connection  # the underlying asyncpg connection
+        async with pg_conn.transaction():
+            await pg_conn.execute(
+                f"SET LOCAL statement_timeout = {statement_timeout('bulk_load')}"
             )
+            await pg_conn.execute(CREATE_STAGING_SQL)
+            with metrics.timer("load_bulk_copy_seconds"):
+                copied = await pg_conn.copy_records_to_table(
+                    "cards_staging", records=records(), columns=CARD_COLUMNS
+                )
+            print(f"Copied into staging: {copied}")
+            with metrics.timer("load_bulk_merge_seconds"):
+                merged = await pg_conn.execute(MERGE_STAGING_SQL)
+            print(f"Merged staging into cards: {merged}")
+
+    print(f"✅ Bulk COPY of {stats['total_cards']} cards completed.")
+    report_changes(stats, existing_hashes)
+
+
+async def upsert_bulk_data(mode="copy", full=False, workers=None):
+    # Check if file exists
+    if not os.path.exists(BULK_DATA_PATH):
+        print(f"❌ File does not exist: {BULK_DATA_PATH}")
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Unless a full import is requested, only new or changed cards are written.
+    existing_hashes = None if full else await load_existing_hashes()
+
+    copied = False
+    if mode == "copy":
+        try:
+            with open(BULK_DATA_PATH, "rb") as f:
+                print(f"✅ File opened: {BULK_DATA_PATH}")
+                await copy_bulk_data(f, existing_hashes, workers)
+            copied = True
+        except Exception as e:
+            print(f"Error during COPY load, falling back to batched inserts: {e}")
+
+    if not copied:
+        with open(BULK_DATA_PATH, "rb") as f:
+            print(f"✅ File opened: {BULK_DATA_PATH}")
+            await insert_bulk_data(f, existing_hashes, workers)
+    # Outside the COPY guard: a failed bump must not rerun a committed load.
+    await bump_data_version()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load Scryfall bulk card data.")
+    parser.add_argument(
+        "--mode",
+        choices=["copy", "insert"],
+        default="copy",
+        help="copy: binary COPY into a staging table and one set-based merge "
+        "(falls back to insert on error); insert: batched INSERT ... ON CONFLICT.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rewrite every card instead of skipping cards whose content hash is unchanged.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to map cards to rows (default: CPU count).",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(upsert_bulk_data())
+    args = parse_args()
+    try:
+        with metrics.timer("load_bulk_run_seconds"):
+            asyncio.run(upsert_bulk_data(args.mode, args.full, args.workers))
+    finally:
+        metrics.write("load_bulk_data")
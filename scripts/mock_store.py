@@ -0,0 +1,52 @@
+import html as html_lib
+import random
+
+# Synthetic bdvtrading.com store pages, shared by the scrape and parser
+# benchmarks. Deliberately free of database imports, so the offline
+# benchmarks run without a DATABASE_URL.
+
+# Synthetic listing ids start here, far above real BDV listing ids, so the
+# bench upserts can never hit (and overwrite) a real listing.
+BENCH_LISTING_ID_BASE = 2_000_000_000
+BENCH_LISTING_ID_MAX = 2**31 - 1  # listings.bdv_listing_id is an integer
+CONDITIONS = ("NM", "LP", "MP", "HP")
+LANGUAGES = ("us", "jp", "de", "fr")
+
+
+def bench_listing_id(seller_index, page_count, page, index):
+    """The synthetic bdv_listing_id of a listing on a mock store page."""
+    return BENCH_LISTING_ID_BASE + (seller_index * page_count + page) * 10_000 + index
+
+
+def render_store_page(seller_name, page, page_count, listings_per_page, card_names):
+    """
+    The {html, pagination_html} of page `page` of a mock store, built
+    deterministically from the seller and page so repeated runs see the
+    same pages.
+    """
+    suffix = seller_name.rsplit("-", 1)[-1]
+    seller_index = int(suffix) if suffix.isdigit() else 0
+    rng = random.Random(f"{seller_name}|{page}")
+    cards = []
+    for i in range(listings_per_page):
+        listing_id = bench_listing_id(seller_index, page_count, page, i)
+        name = html_lib.escape(rng.choice(card_names))
+        cards.append(
+            f'<div class="col product-card shadow">'
+            f'<a class="card-link" href="/card/{listing_id}/">{name}</a>'
+            f'<div class="price">${rng.randint(10, 99_999) / 100:.2f}</div>'
+            f'<span id="product-quantity-{listing_id}">{rng.randint(0, 8)}</span>'
+            f'<div class="condition">{rng.choice(CONDITIONS)}</div>'
+            f'<div class="language"><i class="flag-icon flag-icon-{rng.choice(LANGUAGES)}"></i></div>'
+            f"</div>"
+        )
+    links = "".join(
+        f'<li><a class="page-link" href="?page={n}" data-page="{n}">{n}</a></li>'
+        for n in range(1, page_count + 1)
+    )
+    if page < page_count:
+        links += f'<li><a class="page-link" href="?page={page + 1}">Next</a></li>'
+    return {
+        "html": "\n".join(cards),
+        "pagination_html": f'<ul class="pagination">{links}</ul>',
+    }
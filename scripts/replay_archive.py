@@ -0,0 +1,63 @@
+import argparse
+import json
+import sys
+import time
+from app.archive import iter_archive
+from app.parsing import BACKENDS, get_backend
+from config import ARCHIVE_DIR, PARSER_BACKEND
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay archived store pages through the parser offline."
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default=ARCHIVE_DIR,
+        help="A run directory, a single segment, or the whole archive.",
+    )
+    parser.add_argument("--backend", choices=list(BACKENDS), default=PARSER_BACKEND)
+    parser.add_argument("--seller", help="Only replay this seller's pages.")
+    parser.add_argument(
+        "--dump",
+        action="store_true",
+        help="Print every parsed listing as a JSON line (stats go to stderr).",
+    )
+    args = parser.parse_args()
+
+    backend = get_backend(args.backend)
+    out = sys.stderr if args.dump else sys.stdout
+    pages = 0
+    listings = 0
+    start = time.perf_counter()
+    for record in iter_archive(args.path):
+        if args.seller and record["seller"] != args.seller:
+            continue
+        page_listings = backend.parse_listing_html(record.get("html", ""))
+        backend.parse_pagination(record.get("pagination_html", ""))
+        pages += 1
+        listings += len(page_listings)
+        if args.dump:
+            for listing in page_listings:
+                listing = {
+                    "seller": record["seller"],
+                    "page": record["page"],
+                    **listing._asdict(),
+                }
+                print(json.dumps(listing, ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+
+    if not pages:
+        print(f"No archived pages found in {args.path}.", file=out)
+        return 1
+    print(
+        f"Replayed {pages} pages, {listings} listings with {backend.name} in "
+        f"{elapsed:.2f}s ({pages / elapsed:.0f} pages/s).",
+        file=out,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
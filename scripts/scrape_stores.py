@@ -1,232 +1,750 @@
+import argparse
 import asyncio
-import httpx
-import json
-import os
-from bs4 import BeautifulSoup
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from sqlalchemy import select, text
-from app.db import AsyncSessionLocal
-from app.models import Seller, Card
+from app.archive import get_archive, close_archive
+from app.card_resolver import CardResolver
+from app.crawl_jobs import default_worker_id, enqueue_jobs, lease_job, outstanding_jobs
+from app.crawl_state import load_checkpoint, plan_crawl
+from app.data_version import bump_data_version
+from app.db import get_session
+from app.http_client import get_client, close_client
+from app.loop_lag import LoopLagMonitor
+from app.metrics import ROWS_BUCKETS, metrics, profiled, safe_filename
+from app.models import Seller
+from app.offers import refresh_offer_summary
+from app.page_cache import PageCache, content_hash, worker_cache_path
+from app.parse_pool import get_parse_pool, close_parse_pool
+from app.reconcile import reconcile_seller, touch_listings, touch_seller
 
 from config import (
-    TIMEOUT,
     MAX_CONCURRENT_REQUESTS,
-    HEADERS
+    PAGE_FANOUT,
+    FINGERPRINT_PROBE,
+    PROFILE_SELLER,
+    CRAWL_JOB_POLL_INTERVAL,
+    LISTING_BATCH_SIZE,
+    LISTING_QUEUE_SIZE,
+    HEADERS,
 )
 
 
-async def fetch_store_page(seller_name, store_url, page):
-    """Submit a search request for a seller's store and return the JSON response."""
+async def fetch_store_page(seller_name, store_url, page, extra_headers=None):
+    """
+    Submit a search request for a seller's store and return the response.
+
+    `extra_headers` carries conditional-request validators; a 304 Not
+    Modified response is returned as-is rather than raised.
+    """
     search_url = (
         f"{store_url}/search/json/?"
         f"page={page}&game_type=Magic%20the%20Gathering&search=&set_name_search=&min_price=&max_price="
         f"&sort_by_price=&sort_new_to_old=&condition=&foil=&rarity=&special_editions="
     )
+    headers = {**HEADERS, **(extra_headers or {})}
     # Set Referer dynamically
-    headers = HEADERS.copy()
-    headers["Referer"] = store_url + "/"
-
-    async with httpx.AsyncClient(
-        timeout=TIMEOUT, headers=headers
-    ) as client:
-        response = await client.get(search_url)
-        response.raise_for_status()
-        return response.json()
-
-
-def parse_listing_html(html):
-    """Parse the HTML (from the 'html' key) and extract listing details."""
-    soup = BeautifulSoup(html, "html.parser")
-    listings = []
-    product_cards = soup.find_all(
-        "div", class_="product-card"
-    )  # adjust selector as needed
-    for card in product_cards:
+    response = await get_client().get(
+        search_url, headers=headers, referer=store_url + "/"
+    )
+    if response.status_code == 304:
+        return response
+    response.raise_for_status()
+    return response
+
+
+async def fetch_and_parse_page(seller_name, store_url, page, semaphore, page_cache):
+    """
+    Fetch a single store page and return a page result dict.
+
+    The result holds the parsed `listings`, the pagination info (`has_next`
+    and, for page 1, `page_count`), whether the page is `unchanged` since
+    the last crawl, the page's `content_hash`, and the `cache_entry` to
+    record once its listings have been written. Unchanged pages (304, or
+    same content hash) are not parsed; their cached `touch_ids` are passed
+    on so those listings still count as seen.
+    """
+    cached = page_cache.get(seller_name, page)
+    if cached and "listing_ids" not in cached:
+        # Entry predates listing ids; it can't vouch for the page's listings.
+        cached = None
+    wait_start = time.perf_counter()
+    async with semaphore:
+        metrics.observe(
+            "scrape_semaphore_wait_seconds", time.perf_counter() - wait_start
+        )
+        print(f"Fetching {seller_name} page {page}...")
+        fetch_start = time.perf_counter()
+        response = await fetch_store_page(
+            seller_name, store_url, page, page_cache.conditional_headers(cached)
+        )
+        fetch_seconds = time.perf_counter() - fetch_start
+    metrics.observe("scrape_fetch_seconds", fetch_seconds)
+    metrics.inc("scrape_seller_fetch_seconds_total", fetch_seconds, seller=seller_name)
+    metrics.inc("scrape_pages_total", seller=seller_name)
+    metrics.inc("scrape_responses_total", status=str(response.status_code))
+
+    if response.status_code == 304 and cached:
+        page_cache.not_modified += 1
+        metrics.inc("scrape_pages_unchanged_total", reason="not_modified")
+        return unchanged_page_result(page, cached)
+
+    json_response = response.json()
+
+    # Keep the raw response for debugging and offline replay.
+    get_archive().write(seller_name, page, json_response)
+
+    html_content = json_response.get("html", "")
+    pagination_html = json_response.get("pagination_html", "")
+    page_hash = content_hash(html_content, pagination_html)
+    if cached and cached.get("content_hash") == page_hash:
+        page_cache.unchanged += 1
+        metrics.inc("scrape_pages_unchanged_total", reason="same_hash")
+        return unchanged_page_result(page, cached)
+
+    page_cache.changed += 1
+    parse_start = time.perf_counter()
+    listings, has_next, page_count = await get_parse_pool().parse(
+        html_content, pagination_html
+    )
+    parse_seconds = time.perf_counter() - parse_start
+    metrics.observe("scrape_parse_seconds", parse_seconds)
+    metrics.inc("scrape_seller_parse_seconds_total", parse_seconds, seller=seller_name)
+    metrics.observe("scrape_page_listings", len(listings), buckets=ROWS_BUCKETS)
+    return {
+        "page": page,
+        "listings": listings,
+        "touch_ids": [],
+        "has_next": has_next,
+        "page_count": page_count,
+        "unchanged": False,
+        "content_hash": page_hash,
+        "cache_entry": {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": page_hash,
+            "has_next": has_next,
+            "page_count": page_count,
+            "listing_ids": [listing.bdv_listing_id for listing in listings],
+        },
+    }
+
+
+def unchanged_page_result(page, cached):
+    """Build a page result for a page that hasn't changed since the last crawl."""
+    return {
+        "page": page,
+        "listings": [],
+        "touch_ids": cached["listing_ids"],
+        "has_next": cached.get("has_next", False),
+        "page_count": cached.get("page_count"),
+        "unchanged": True,
+        "content_hash": cached.get("content_hash"),
+        "cache_entry": None,
+    }
+
+
+async def process_store_for_seller(seller, semaphore, resolver, page_cache, checkpoint):
+    """
+    For a given seller, paginate through the search results,
+    extract listing details, and upsert listings into the database.
+
+    Parsed pages are handed to a writer task through a bounded queue and
+    upserted in batches of LISTING_BATCH_SIZE, so memory use per seller does
+    not grow with the size of the store and pages that were already written
+    survive a later failure. Progress is recorded in `checkpoint`, and the
+    crawl starts from its resume page.
+
+    After a complete crawl that reached the store's last page, listings
+    that were not seen in it are reconciled away (see RECONCILE_MODE). If
+    the fingerprint probe finds the store unchanged, the crawl stops after
+    page 1 and the seller's listings are simply marked as seen.
+    """
+    seller_name = seller["name"]
+    seller_start = time.perf_counter()
+    upserted = 0
+    removed = 0
+    # Errors are handled per seller, so one seller's database error doesn't
+    # abort the other sellers' crawls.
+    try:
+        await checkpoint.save()
+        queue = asyncio.Queue(maxsize=LISTING_QUEUE_SIZE)
+        writer = asyncio.create_task(
+            listing_writer(seller_name, queue, resolver, page_cache, checkpoint)
+        )
         try:
-            card_link = card.find("a", class_="card-link")
-            card_name = card_link.get_text(strip=True) if card_link else None
-            detail_url = (
-                card_link["href"] if card_link and card_link.has_attr("href") else None
+            await crawl_store_pages(
+                seller_name,
+                seller["store_url"],
+                semaphore,
+                queue,
+                page_cache,
+                checkpoint,
             )
-
-            quantity_span = card.find(
-                "span", id=lambda x: x and x.startswith("product-quantity-")
+        finally:
+            # Sentinel: tells the writer to flush what's left and stop.
+            await queue.put(None)
+            upserted = await writer
+
+        if checkpoint.store_unchanged:
+            touched = await touch_seller(checkpoint.seller_id)
+            checkpoint.listings_written = touched
+            print(
+                f"{seller_name} unchanged since last crawl; marked {touched} listings seen."
             )
-            bdv_listing_id = None
-            if quantity_span and "id" in quantity_span.attrs:
-                id_parts = quantity_span["id"].split("-")
-                if id_parts and len(id_parts) >= 3:
-                    bdv_listing_id = int(id_parts[-1])
-
-            price_div = card.find("div", class_="price")
-            price_text = price_div.get_text(strip=True) if price_div else ""
-            price = float(price_text.replace("$", "")) if price_text else None
-
-            quantity_text = quantity_span.get_text(strip=True) if quantity_span else "0"
-            quantity = int(quantity_text)
-
-            condition_div = card.find("div", class_="condition")
-            condition = condition_div.get_text(strip=True) if condition_div else "N/A"
-
-            language_div = card.find("div", class_="language")
-            language = "unknown"
-            if language_div:
-                flag_icon = language_div.find("i")
-                if flag_icon and flag_icon.has_attr("class"):
-                    for cls in flag_icon["class"]:
-                        if cls.startswith("flag-icon-"):
-                            language = cls.replace("flag-icon-", "")
-                            break
-
-            listings.append(
-                {
-                    "bdv_listing_id": bdv_listing_id,
-                    "card_name": card_name,
-                    "detail_url": detail_url,
-                    "price": price,
-                    "quantity": quantity,
-                    "condition": condition,
-                    "language": language,
-                    "foil": False,  # Default to False unless specified otherwise
-                }
+        elif not checkpoint.failed and not checkpoint.reached_end:
+            # Never reconcile against a crawl that may have missed pages.
+            print(f"{seller_name}: last page not confirmed; skipping reconcile.")
+        elif not checkpoint.failed:
+            removed = await reconcile_seller(
+                checkpoint.seller_id, checkpoint.started_at
             )
+            if removed:
+                print(f"Removed {removed} vanished listings for {seller_name}.")
+        await checkpoint.finish()
+    except Exception as e:
+        print(f"Error crawling {seller_name}: {e}")
+        metrics.inc("scrape_seller_errors_total")
+        checkpoint.failed = True
+        try:
+            await checkpoint.finish()
         except Exception as e:
-            print(f"Error parsing a product card: {e}")
-    return listings
-
+            print(f"Error saving crawl state for {seller_name}: {e}")
+    if upserted or removed:
+        # Lets API response caches know this seller's data changed.
+        try:
+            await bump_data_version()
+        except Exception as e:
+            print(f"Error bumping the data version after {seller_name}: {e}")
+            metrics.inc("scrape_seller_errors_total")
+    if not upserted and not checkpoint.store_unchanged:
+        print(f"No listings to insert for {seller_name}.")
 
-def has_next_page(pagination_html):
-    """Parse pagination HTML and return True if a 'Next' link exists."""
-    soup = BeautifulSoup(pagination_html, "html.parser")
-    next_link = soup.find("a", string=lambda s: s and s.strip().lower() == "next")
-    return next_link is not None
+    metrics.set(
+        "scrape_seller_duration_seconds",
+        time.perf_counter() - seller_start,
+        seller=seller_name,
+    )
+    metrics.set("scrape_seller_listings_written", upserted, seller=seller_name)
+    metrics.inc("scrape_listings_removed_total", removed)
+    if checkpoint.store_unchanged:
+        status = "unchanged"
+    else:
+        status = "failed" if checkpoint.failed else "complete"
+    metrics.inc("scrape_sellers_total", status=status)
 
 
-async def process_store_for_seller(seller, semaphore):
+async def crawl_store_pages(
+    seller_name, store_url, semaphore, queue, page_cache, checkpoint
+):
     """
-    For a given seller, paginate through the search results,
-    extract listing details, and upsert listings into the database.
+    Fetch and parse every page of a seller's store from the checkpoint's
+    resume page on, putting each page result on `queue`.
+
+    When PAGE_FANOUT is enabled and the first page's pagination HTML gives
+    the total page count, the remaining pages are fetched concurrently
+    (still bounded by `semaphore`); if the last of them still has a 'Next'
+    link (windowed pagination), the walk continues one by one from there.
+    Otherwise pages are walked one by one until there is no 'Next' link.
     """
-    seller_name = seller["name"]
-    store_url = seller["store_url"]
-    page = 1
-    all_listings = []
-
+    first_page = page = checkpoint.resume_page
     while True:
-        async with semaphore:
-            try:
-                print(f"Fetching {seller_name} page {page}...")
-                json_response = await fetch_store_page(seller_name, store_url, page)
-            except Exception as e:
-                print(f"Error fetching {seller_name} page {page}: {e}")
+        try:
+            result = await fetch_and_parse_page(
+                seller_name, store_url, page, semaphore, page_cache
+            )
+        except Exception as e:
+            print(f"Error fetching {seller_name} page {page}: {e}")
+            checkpoint.failed = True
+            break
+
+        if page == 1:
+            checkpoint.fingerprint = result["content_hash"]
+            if (
+                FINGERPRINT_PROBE
+                and checkpoint.previous_fingerprint
+                and checkpoint.fingerprint == checkpoint.previous_fingerprint
+            ):
+                checkpoint.store_unchanged = True
+                checkpoint.page_done(page)
                 break
 
-        # Save raw JSON response for debugging
-        log_path = os.path.join(
-            "app/cache/sellers", f"{seller_name}_page_{page}_response.json"
-        )
-        with open(log_path, "w", encoding="utf-8") as f:
-            json.dump(json_response, f, ensure_ascii=False, indent=4)
-        print(f"Saved raw response for {seller_name} page {page}.")
-
-        html_content = json_response.get("html", "")
-        pagination_html = json_response.get("pagination_html", "")
-        listings = parse_listing_html(html_content)
-        if listings:
-            print(f"Found {len(listings)} listings on {seller_name} page {page}.")
-            all_listings.extend(listings)
-        else:
-            print(f"No listings found on {seller_name} page {page}.")
+        if not await enqueue_page(seller_name, result, queue, checkpoint):
+            checkpoint.reached_end = True
             break
 
-        if has_next_page(pagination_html):
+        page_count = None
+        if page == first_page and PAGE_FANOUT:
+            page_count = result["page_count"]
+        if page_count is not None and page_count > page:
+            checkpoint.page_count = page_count
+            last_has_next = await fetch_remaining_pages(
+                seller_name,
+                store_url,
+                page,
+                page_count,
+                semaphore,
+                queue,
+                page_cache,
+                checkpoint,
+            )
+            if last_has_next is None:
+                break  # The last page failed; the checkpoint is marked failed.
+            if not last_has_next:
+                checkpoint.reached_end = True
+                break
+            # Windowed pagination ("1 2 3 ... 10 Next") only links the first
+            # pages; walk on from the last one.
+            print(f"{seller_name} has pages past {page_count}; continuing one by one.")
+            page = page_count + 1
+            continue
+
+        if result["has_next"]:
             page += 1
         else:
+            checkpoint.reached_end = True
             break
 
-    if all_listings:
-        await upsert_listings(seller_name, all_listings)
-    else:
-        print(f"No listings to insert for {seller_name}.")
 
+async def enqueue_page(seller_name, result, queue, checkpoint):
+    """
+    Hand a page result to the writer. Returns False when the page was empty,
+    which ends a sequential walk.
 
-async def get_card_by_name(card_name):
-    """Retrieve the card object from the database by name."""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(Card).filter_by(name=card_name))
-        return result.scalars().first()
+    Pages with nothing to write are marked done on the checkpoint right
+    away; the writer marks the others once they are committed. Unchanged
+    pages go to the writer only to mark their listings as seen.
+    """
+    page = result["page"]
+    if result["unchanged"]:
+        print(f"{seller_name} page {page} unchanged since last crawl; skipping.")
+        if result["touch_ids"]:
+            await queue.put(result)
+            observe_queue_depth(queue)
+        else:
+            checkpoint.page_done(page)
+        return True
+    if result["listings"]:
+        print(f"Found {len(result['listings'])} listings on {seller_name} page {page}.")
+        await queue.put(result)
+        observe_queue_depth(queue)
+        return True
+    print(f"No listings found on {seller_name} page {page}.")
+    checkpoint.page_done(page)
+    return False
+
+
+def observe_queue_depth(queue):
+    """Record how many page results are waiting for the writer."""
+    metrics.observe(
+        "scrape_queue_depth",
+        queue.qsize(),
+        buckets=tuple(range(LISTING_QUEUE_SIZE + 1)),
+    )
 
 
-async def upsert_listings(seller_name, listings):
-    """Upsert listings into the database."""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(Seller).filter_by(name=seller_name))
-        seller_obj = result.scalars().first()
-        if not seller_obj:
-            print(f"Seller {seller_name} not found in the database.")
-            return
+async def fetch_remaining_pages(
+    seller_name,
+    store_url,
+    first_page,
+    page_count,
+    semaphore,
+    queue,
+    page_cache,
+    checkpoint,
+):
+    """
+    Fetch pages first_page+1..page_count concurrently and put their results
+    on `queue`. Returns whether the last page still has a 'Next' link, or
+    None if it could not be fetched.
 
-        batch = []
-        for listing in listings:
-            card = await get_card_by_name(listing["card_name"])
-            if not card:
-                print(f"Card '{listing['card_name']}' not found; skipping listing.")
+    A fixed number of fetchers pull page numbers from a shared iterator, so
+    at most MAX_CONCURRENT_REQUESTS of this seller's pages are held in
+    memory while waiting for room on the queue.
+    """
+    if page_count <= first_page:
+        return
+    print(f"Fanning out {page_count - first_page} more pages for {seller_name}.")
+    pages = iter(range(first_page + 1, page_count + 1))
+    last_has_next = None
+
+    async def fetcher():
+        nonlocal last_has_next
+        for page in pages:
+            try:
+                result = await fetch_and_parse_page(
+                    seller_name, store_url, page, semaphore, page_cache
+                )
+            except Exception as e:
+                print(f"Error fetching {seller_name} page {page}: {e}")
+                checkpoint.failed = True
                 continue
-            batch.append(
-                {
-                    "bdv_listing_id": listing["bdv_listing_id"],
-                    "seller_id": seller_obj.id,
-                    "card_id": card.id,
-                    "price": listing["price"],
-                    "quantity": listing["quantity"],
-                    "condition": listing["condition"],
-                    "foil": listing["foil"],
-                    "language": listing["language"],
-                    "last_seen": datetime.utcnow(),
-                }
-            )
+            if page == page_count:
+                last_has_next = result["has_next"]
+            await enqueue_page(seller_name, result, queue, checkpoint)
+
+    fetchers = min(MAX_CONCURRENT_REQUESTS, page_count - first_page)
+    await asyncio.gather(*(fetcher() for _ in range(fetchers)))
+    return last_has_next
+
+
+async def listing_writer(seller_name, queue, resolver, page_cache, checkpoint):
+    """
+    Drain page results from `queue` and upsert their listings in batches,
+    all through one session.
+
+    Stops at the `None` sentinel and returns the number of listings written.
+    A page's cache entry and checkpoint progress are only recorded once its
+    batch has been written, so a failed write is retried on the next crawl.
+    A failed batch is reported and dropped; the writer keeps draining so the
+    fetchers are never left blocked on a full queue.
+    """
 
-        if not batch:
-            print(f"No valid listings to insert for {seller_name}.")
-            return
-
-        sql = """
-        INSERT INTO listings (bdv_listing_id, seller_id, card_id, price, quantity, condition, foil, language, last_seen)
-        VALUES (:bdv_listing_id, :seller_id, :card_id, :price, :quantity, :condition, :foil, :language, :last_seen)
-        ON CONFLICT (bdv_listing_id) DO UPDATE
-        SET price = EXCLUDED.price,
-            quantity = EXCLUDED.quantity,
-            condition = EXCLUDED.condition,
-            foil = EXCLUDED.foil,
-            language = EXCLUDED.language,
-            last_seen = EXCLUDED.last_seen;
-        """
+    async def flush(batch, touch_ids, pages):
+        try:
+            written = 0
+            if batch:
+                written = await upsert_listings(
+                    session, seller_name, checkpoint.seller_id, batch, resolver
+                )
+            touched = 0
+            if touch_ids and written is not None:
+                touched = await touch_listings(session, checkpoint.seller_id, touch_ids)
+        except Exception as e:
+            print(f"Error writing listings for {seller_name}: {e}")
+            written = None
+            try:
+                await session.rollback()
+            except Exception:
+                pass  # The connection is discarded; the next batch gets a new one.
+        if written is None:
+            checkpoint.failed = True
+            return 0
+        for result in pages:
+            if result["cache_entry"] is not None:
+                page_cache.put(seller_name, result["page"], result["cache_entry"])
+            checkpoint.page_done(result["page"])
+        # Listings on unchanged pages still count towards the store's size.
+        checkpoint.listings_written += written + touched
         try:
-            result = await session.execute(text(sql), batch)
-            await session.commit()
-            print(f"Upserted {result.rowcount} listings for seller {seller_name}.")
+            await checkpoint.save()
         except Exception as e:
-            print(f"Error during listings upsert for {seller_name}: {e}")
-            await session.rollback()
+            # Never let the writer die: the fetchers would block on a full queue.
+            print(f"Error saving crawl state for {seller_name}: {e}")
+            checkpoint.failed = True
+        return written
+
+    batch = []
+    touch_ids = []
+    pages = []
+    upserted = 0
+    # One session for the seller's whole crawl; it only holds a pooled
+    # connection while a batch's transaction is open.
+    async with get_session("scrape") as session:
+        while True:
+            result = await queue.get()
+            if result is None:
+                break
+            batch.extend(result["listings"])
+            touch_ids.extend(result["touch_ids"])
+            pages.append(result)
+            if len(batch) + len(touch_ids) >= LISTING_BATCH_SIZE:
+                upserted += await flush(batch, touch_ids, pages)
+                batch = []
+                touch_ids = []
+                pages = []
+        if pages:
+            upserted += await flush(batch, touch_ids, pages)
+    return upserted
+
+
+async def upsert_listings(session, seller_name, seller_id, listings, resolver):
+    """
+    Upsert a seller's listings through `session`, resolving card names via
+    `resolver`. The offer summary of every card in the batch is refreshed
+    in the same transaction.
 
+    Returns the number of listings written, or None if the upsert failed.
+    """
+    with metrics.timer("scrape_resolve_seconds"):
+        card_ids = await resolver.resolve_many(
+            session, [listing.card_name for listing in listings]
+        )
+    # The ListingRecords are read as-is; the only per-listing dict is the
+    # bind-parameter row the driver needs.
+    last_seen = datetime.utcnow()
+    batch = []
+    dropped = 0
+    for listing in listings:
+        card_id = card_ids.get(listing.card_name)
+        if card_id is None:
+            dropped += 1
+            continue
+        batch.append(
+            {
+                "bdv_listing_id": listing.bdv_listing_id,
+                "seller_id": seller_id,
+                "card_id": card_id,
+                "price": listing.price,
+                "quantity": listing.quantity,
+                "condition": listing.condition,
+                "foil": listing.foil,
+                "language": listing.language,
+                "last_seen": last_seen,
+            }
+        )
+
+    if dropped:
+        resolver.record_dropped(dropped)
+        metrics.inc("scrape_listings_dropped_total", dropped)
+        print(f"Skipped {dropped} listings for {seller_name}; card name not found.")
+
+    if not batch:
+        print(f"No valid listings to insert for {seller_name}.")
+        # End the resolver's read transaction so the connection goes back to the pool.
+        await session.commit()
+        return 0
+
+    sql = """
+    INSERT INTO listings (bdv_listing_id, seller_id, card_id, price, quantity, condition, foil, language, last_seen)
+    VALUES (:bdv_listing_id, :seller_id, :card_id, :price, :quantity, :condition, :foil, :language, :last_seen)
+    ON CONFLICT (bdv_listing_id) DO UPDATE
+    SET price = EXCLUDED.price,
+        quantity = EXCLUDED.quantity,
+        condition = EXCLUDED.condition,
+        foil = EXCLUDED.foil,
+        language = EXCLUDED.language,
+        last_seen = EXCLUDED.last_seen,
+        removed_at = NULL;
+    """
+    metrics.observe("scrape_batch_rows", len(batch), buckets=ROWS_BUCKETS)
+    upsert_start = time.perf_counter()
+    try:
+        result = await session.execute(text(sql), batch)
+        await refresh_offer_summary(session, {row["card_id"] for row in batch})
+        await session.commit()
+        print(f"Upserted {result.rowcount} listings for seller {seller_name}.")
+        return len(batch)
+    except Exception as e:
+        print(f"Error during listings upsert for {seller_name}: {e}")
+        metrics.inc("scrape_upsert_errors_total")
+        await session.rollback()
+        return None
+    finally:
+        upsert_seconds = time.perf_counter() - upsert_start
+        metrics.observe("scrape_upsert_seconds", upsert_seconds)
+        metrics.inc(
+            "scrape_seller_db_seconds_total", upsert_seconds, seller=seller_name
+        )
 
-async def main():
-    # Retrieve sellers from the database.
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(Seller))
-        sellers = [
-            {"name": s.name, "store_url": s.store_url} for s in result.scalars().all()
+
+async def load_sellers(seller_names=None):
+    """Return every seller (or only `seller_names`) as plain dicts."""
+    async with get_session("scrape") as session:
+        query = select(Seller)
+        if seller_names is not None:
+            query = query.where(Seller.name.in_(seller_names))
+        result = await session.execute(query)
+        return [
+            {"id": s.id, "name": s.name, "store_url": s.store_url}
+            for s in result.scalars().all()
         ]
 
+
+@asynccontextmanager
+async def crawl_run(page_cache=None, metrics_job="scrape_stores"):
+    """
+    Set up what every seller crawl in this process shares (card resolver,
+    request semaphore, page cache, loop lag monitor), yield them, then shut
+    down the client, parse pool and archive and report.
+    """
+    # One resolver shared by every seller task for the whole run.
+    resolver = CardResolver()
+    async with get_session("scrape") as session:
+        await resolver.preload(session)
+
     # Create a semaphore to limit concurrent requests
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    if page_cache is None:
+        page_cache = PageCache()
+    loop_lag = LoopLagMonitor()
+    loop_lag.start()
+
+    try:
+        yield semaphore, resolver, page_cache
+    finally:
+        await loop_lag.stop()
+        record_run_metrics(get_client().stats(), loop_lag.stats(), resolver, page_cache)
+        await close_client()
+        close_parse_pool()
+        page_cache.save()
+        close_archive()  # Last: it re-raises if the archive writer died.
+    resolver.report()
+    page_cache.report()
+    loop_lag.report()
+    metrics.write(metrics_job)
+
+
+async def main(seller_names=None, page_cache=None, metrics_job="scrape_stores"):
+    """
+    Crawl every seller's store (or only `seller_names`) in this process.
+    `page_cache` defaults to the on-disk PageCache; run metrics are written
+    under `metrics_job`.
+    """
+    sellers = await load_sellers(seller_names)
+    # Skip freshly crawled sellers, resume interrupted ones, stalest first.
+    async with get_session("scrape") as session:
+        plan = await plan_crawl(session, sellers)
+
+    async with crawl_run(page_cache, metrics_job) as (semaphore, resolver, page_cache):
+        # Optionally profile one seller, crawled on its own so other sellers'
+        # tasks don't show up in its profile.
+        profile_plan = [c for c in plan if c.seller["name"] == PROFILE_SELLER]
+        if profile_plan:
+            checkpoint = profile_plan[0]
+            plan = [c for c in plan if c is not checkpoint]
+            async with profiled(PROFILE_SELLER):
+                await process_store_for_seller(
+                    checkpoint.seller, semaphore, resolver, page_cache, checkpoint
+                )
+
+        # Tasks are created in priority order, and the semaphore serves
+        # waiters first-come first-served.
+        tasks = [
+            asyncio.create_task(
+                process_store_for_seller(
+                    checkpoint.seller, semaphore, resolver, page_cache, checkpoint
+                )
+            )
+            for checkpoint in plan
+        ]
+        await asyncio.gather(*tasks)
 
-    tasks = [
-        asyncio.create_task(process_store_for_seller(seller, semaphore))
-        for seller in sellers
-    ]
-    await asyncio.gather(*tasks)
+
+async def coordinate(seller_names=None):
+    """
+    Plan a distributed crawl: queue a crawl job for every seller that needs
+    one, in priority order, for `worker` processes to lease.
+    """
+    sellers = await load_sellers(seller_names)
+    async with get_session("scrape") as session:
+        plan = await plan_crawl(session, sellers)
+    await enqueue_jobs(plan)
+
+
+async def worker(worker_id=None, sellers_in_flight=MAX_CONCURRENT_REQUESTS):
+    """
+    Crawl sellers leased from the crawl_jobs queue until it is drained.
+
+    Any number of workers, on any number of hosts, can run against the same
+    database; each job is leased by one worker at a time. Leases are renewed
+    while a seller is being crawled, and a dead worker's jobs are reclaimed
+    by the others once its leases expire.
+    """
+    owner = worker_id or default_worker_id()
+    print(f"Worker {owner} starting with {sellers_in_flight} sellers in flight.")
+    metrics_job = f"scrape_stores_{safe_filename(owner)}"
+
+    # Workers on one host must not share a page cache file.
+    page_cache = PageCache(path=worker_cache_path(owner))
+    async with crawl_run(page_cache, metrics_job) as (semaphore, resolver, page_cache):
+
+        async def slot():
+            while True:
+                lease = await lease_job(owner)
+                if lease is None:
+                    # Wait for jobs still leased elsewhere; they may come back
+                    # if their worker dies or the crawl fails.
+                    if not await outstanding_jobs():
+                        return
+                    await asyncio.sleep(CRAWL_JOB_POLL_INTERVAL)
+                    continue
+                await crawl_leased_seller(lease, semaphore, resolver, page_cache)
+
+        await asyncio.gather(*(slot() for _ in range(sellers_in_flight)))
+    print(f"Worker {owner} finished: no crawl jobs left.")
+
+
+async def crawl_leased_seller(lease, semaphore, resolver, page_cache):
+    """Crawl a leased seller, renewing the lease until the crawl is done."""
+    seller = lease.seller
+    async with get_session("scrape") as session:
+        checkpoint = await load_checkpoint(session, seller)
+    print(f"Leased {seller['name']} (attempt {lease.attempts}).")
+
+    crawl = asyncio.create_task(
+        process_store_for_seller(seller, semaphore, resolver, page_cache, checkpoint)
+    )
+    failed = False
+    while not crawl.done():
+        await asyncio.wait({crawl}, timeout=lease.lease_seconds / 3)
+        if not crawl.done() and not await lease.renew():
+            print(f"Lost the lease on {seller['name']}; abandoning its crawl.")
+            crawl.cancel()
+    try:
+        await crawl
+    except asyncio.CancelledError:
+        # Another worker owns the job now.
+        metrics.inc("scrape_jobs_total", status="lost")
+        return
+    except Exception as e:
+        print(f"Error crawling {seller['name']}: {e}")
+        failed = True
+    status = await lease.finish(failed=failed or checkpoint.failed)
+    metrics.inc("scrape_jobs_total", status=status)
+
+
+def record_run_metrics(client_stats, loop_lag_stats, resolver, page_cache):
+    """Copy the run-level stats of the client, loop, resolver and cache into metrics."""
+    metrics.set("scrape_http_requests", client_stats["requests"])
+    metrics.set("scrape_http_connections_opened", client_stats["connections_opened"])
+    metrics.set("scrape_http_retries", client_stats["retries"])
+    for host, limiter in client_stats["hosts"].items():
+        metrics.set("scrape_rate_limit_rps", limiter["rate"], host=host)
+        metrics.set("scrape_rate_limit_throttled", limiter["throttled"], host=host)
+    metrics.set("scrape_loop_lag_p99_ms", loop_lag_stats["p99_ms"])
+    metrics.set("scrape_loop_lag_max_ms", loop_lag_stats["max_ms"])
+    metrics.set("scrape_resolver_hits", resolver.hits)
+    metrics.set("scrape_resolver_misses", resolver.misses)
+    metrics.set("scrape_resolver_fuzzy_matches", resolver.fuzzy_matches)
+    metrics.set("scrape_page_cache_evicted", page_cache.evicted)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape seller stores.")
+    parser.add_argument(
+        "--mode",
+        choices=["local", "coordinator", "worker"],
+        default="local",
+        help="local: crawl everything in this process; coordinator: queue crawl "
+        "jobs for workers; worker: crawl jobs leased from the queue.",
+    )
+    parser.add_argument(
+        "--seller",
+        action="append",
+        dest="sellers",
+        help="Only crawl (or queue) this seller; repeatable.",
+    )
+    parser.add_argument(
+        "--worker-id",
+        help="Worker name (default: host:pid:random). Also names the worker's page "
+        "cache file, so give a stable one to reuse the cache across runs.",
+    )
+    parser.add_argument(
+        "--sellers-in-flight",
+        type=int,
+        default=MAX_CONCURRENT_REQUESTS,
+        help="Sellers a worker crawls at once.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.mode == "coordinator":
+        asyncio.run(coordinate(args.sellers))
+    elif args.mode == "worker":
+        asyncio.run(worker(args.worker_id, args.sellers_in_flight))
+    else:
+        asyncio.run(main(args.sellers))